@@ -10,20 +10,78 @@
 # - function code blocks
 
 import os
-import json
-from typing import List, Dict, Any, Optional, Tuple
-from tree_sitter import Parser, Node, Language
+import sys
+import mmap
+import time
+import hashlib
+import threading
+import multiprocessing
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from bisect import bisect_right
+from functools import lru_cache, partial
+from itertools import chain, islice
+from types import MappingProxyType
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Union, Callable, Deque
+import orjson
+from tree_sitter import Parser, Node, Language, Query, QueryCursor
 import tree_sitter_javascript
 import tree_sitter_python
 import tree_sitter_java
 import tree_sitter_cpp
 import tree_sitter_rust
 
-# Set up parser globally
-parser = Parser()
+# Parsers are created lazily, one per thread per language, and reused for
+# every file that thread parses (see _get_parser)
+_TLS = threading.local()
+
+# Per-file results can be cached on disk as JSON in a directory the caller
+# owns, keyed by relative path and a hash of the contents, so files that are
+# touched or re-extracted without changing still hit. Bump the version when
+# the result format changes.
+CACHE_DIR_NAME = ".code_lantern_cache"
+CACHE_VERSION = 4
+
+# In-memory LRU of legacy analyze_file results, keyed by (language, content hash)
+CONTENT_CACHE_SIZE = 4096
+_CONTENT_CACHE: "OrderedDict[Tuple[str, bytes], Tuple[List[str], List[str]]]" = OrderedDict()
+_CONTENT_CACHE_LOCK = threading.Lock()
+
+# Source bytes kept for get_function_code, keyed by (path, mtime_ns, size).
+# Entries are at most MAX_FILE_BYTES, so this holds at most 8 MiB per process.
+SOURCE_CACHE_SIZE = 8
+
+# Upper bound on worker processes used for whole-repo analysis
+MAX_ANALYSIS_WORKERS = 64
+
+# Files per task sent to a pool worker, and tasks kept in flight per worker
+# while discovery is still running (see _submit_in_order)
+ANALYSIS_BATCH_SIZE = 8
+ANALYSIS_BATCHES_PER_WORKER = 4
+
+# Lazily created process pool reused across analyses (see _get_analysis_pool)
+_ANALYSIS_POOL: Optional[ProcessPoolExecutor] = None
+_ANALYSIS_POOL_LOCK = threading.Lock()
+
+# Threads used to scan directories during file discovery (I/O bound)
+SCAN_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# Files at least this large are memory-mapped rather than read into memory
+MMAP_MIN_BYTES = 64 * 1024
+
+# Larger files are skipped at discovery: generated code and minified bundles
+# cost the most to parse and add little to the architecture map
+MAX_FILE_BYTES = 1024 * 1024
+
+# Files whose first lines run longer than this are treated as minified or
+# generated and skipped, as are *.min.* files
+MINIFIED_LINE_LENGTH = int(os.getenv("MINIFIED_LINE_LENGTH", "2000"))
+MINIFIED_SAMPLE_LINES = 20
 
 # Directories to ignore during analysis
-IGNORED_DIRECTORIES = {
+IGNORED_DIRECTORIES = frozenset({
     '.git', '.svn', '.hg',
     'node_modules', 'bower_components', '.npm', '.yarn',
     'venv', '.venv', 'env', '.env', 'virtualenv',
@@ -36,10 +94,10 @@ IGNORED_DIRECTORIES = {
     'coverage', '.coverage', 'htmlcov', '.tox',
     'tmp', 'temp', 'logs',
     'assets', 'static', 'public', 'media', 'uploads',
-}
+})
 
 # Supported file extensions
-SUPPORTED_EXTENSIONS = {
+SUPPORTED_EXTENSIONS = MappingProxyType({
     '.py': 'python',
     '.js': 'javascript',
     '.ts': 'typescript',
@@ -52,208 +110,518 @@ SUPPORTED_EXTENSIONS = {
     '.h': 'cpp',
     '.hpp': 'cpp',
     '.rs': 'rust'
+})
+
+# Extension -> parser language key (see _LANG_CACHE)
+EXTENSION_TO_LANG = MappingProxyType({
+    '.js': 'js', '.jsx': 'js', '.ts': 'js', '.tsx': 'js',
+    '.py': 'py',
+    '.java': 'java',
+    '.cpp': 'cpp', '.cc': 'cpp', '.cxx': 'cpp', '.h': 'cpp', '.hpp': 'cpp',
+    '.rs': 'rust',
+})
+
+# Suffixes for a single str.endswith probe per lowercased file name, so
+# discovery accepts the same names detect_language does (.py, .PY, .Py)
+_SUPPORTED_SUFFIXES = tuple(SUPPORTED_EXTENSIONS)
+
+# Control flow node types that increase cyclomatic complexity, per language
+COMPLEXITY_NODE_TYPES: Dict[str, frozenset] = {
+    "py": frozenset({
+        'if_statement', 'elif_clause', 'for_statement', 'while_statement',
+        'try_statement', 'except_clause', 'with_statement',
+        'conditional_expression',  # ternary
+        'boolean_operator',  # and/or
+        'list_comprehension', 'dictionary_comprehension', 'set_comprehension',
+        'generator_expression',
+    }),
+    "js": frozenset({
+        'if_statement', 'for_statement', 'for_in_statement', 'while_statement',
+        'do_statement', 'switch_case', 'try_statement', 'catch_clause',
+        'with_statement', 'ternary_expression',
+        'binary_expression',  # && and || only, see _branch_pattern
+    }),
+    "java": frozenset({
+        'if_statement', 'for_statement', 'enhanced_for_statement', 'while_statement',
+        'do_statement', 'try_statement', 'catch_clause', 'switch_expression',
+        'ternary_expression',
+        'binary_expression',
+    }),
+    "cpp": frozenset({
+        'if_statement', 'for_statement', 'while_statement', 'do_statement',
+        'try_statement', 'catch_clause', 'case_statement',
+        'conditional_expression',  # ternary
+        'binary_expression',
+    }),
+    "rust": frozenset({
+        'if_expression', 'for_expression', 'while_expression', 'loop_expression',
+        'match_arm',
+        'binary_expression',
+    }),
 }
 
-# Control flow node types that increase cyclomatic complexity
-COMPLEXITY_NODE_TYPES = {
+# Operator tokens that make a binary expression a branch point
+LOGICAL_OPERATORS = frozenset({'&&', '||', 'and', 'or'})
+
+# Built-in functions excluded from call extraction
+BUILTIN_CALLS = frozenset({
     # Python
-    'if_statement', 'elif_clause', 'for_statement', 'while_statement',
-    'try_statement', 'except_clause', 'with_statement',
-    'conditional_expression',  # ternary
-    'boolean_operator',  # and/or
-    'list_comprehension', 'dictionary_comprehension', 'set_comprehension',
-    'generator_expression',
-    # JavaScript/TypeScript
-    'if_statement', 'for_statement', 'for_in_statement', 'while_statement',
-    'do_statement', 'switch_case', 'catch_clause', 'ternary_expression',
-    'binary_expression',  # will filter for && and ||
+    'print', 'len', 'str', 'int', 'float', 'list', 'dict', 'set', 'tuple',
+    'range', 'open', 'type', 'isinstance', 'hasattr', 'getattr', 'setattr',
+    'super', 'map', 'filter', 'zip', 'enumerate', 'sorted', 'reversed',
+    'min', 'max', 'sum', 'abs', 'round', 'format', 'input', 'bool', 'bytes',
+    # JavaScript
+    'console', 'require', 'import', 'export', 'setTimeout', 'setInterval',
+    'clearTimeout', 'clearInterval', 'fetch', 'Promise', 'Array', 'Object',
+    'String', 'Number', 'Boolean', 'JSON', 'Math', 'Date', 'RegExp', 'Error',
     # Java
-    'if_statement', 'for_statement', 'enhanced_for_statement', 'while_statement',
-    'do_statement', 'catch_clause', 'switch_expression',
+    'System', 'println', 'new', 'toString', 'equals', 'hashCode',
     # C++
-    'if_statement', 'for_statement', 'while_statement', 'do_statement',
-    'catch_clause', 'case_statement',
+    'std', 'cout', 'cin', 'printf', 'scanf', 'sizeof', 'malloc', 'free',
     # Rust
-    'if_expression', 'for_expression', 'while_expression', 'loop_expression',
-    'match_arm',
+    'vec', 'Some', 'None', 'Ok', 'Err', 'Box', 'Rc', 'Arc',
+    # Control flow keywords that look like calls
+    'if', 'for', 'while', 'switch', 'catch', 'match',
+})
+
+# Tree-sitter Language objects, built once at import (new v0.25 API)
+_LANG_CACHE: Dict[str, Language] = {
+    lang: Language(capsule)
+    for lang, capsule in {
+        "js": tree_sitter_javascript.language(),
+        "py": tree_sitter_python.language(),
+        "java": tree_sitter_java.language(),
+        "cpp": tree_sitter_cpp.language(),
+        "rust": tree_sitter_rust.language(),
+    }.items()
+}
+
+# Function node types for each language
+FUNCTION_TYPES: Dict[str, Tuple[str, ...]] = {
+    "py": ("function_definition",),
+    "js": ("function_declaration", "arrow_function", "function_expression", "method_definition"),
+    "java": ("method_declaration", "constructor_declaration"),
+    "cpp": ("function_definition",),
+    "rust": ("function_item",),
+}
+
+# Every function definition or import in these languages contains one of
+# these tokens, so files without any of them skip parsing entirely. JS
+# methods, Java and C++ have no such mandatory keyword and are always parsed.
+PREFILTER_TOKENS: Dict[str, Tuple[bytes, ...]] = {
+    "py": (b"def", b"import"),
+    "rust": (b"fn", b"use"),
+}
+
+# Nested definitions that get their own entry in listOfFunctions; calls
+# inside them belong to that entry, not to the enclosing function.
+# Anonymous JS functions are left out: they are never listed on their own.
+NESTED_FUNCTION_TYPES: Dict[str, Tuple[str, ...]] = {
+    **FUNCTION_TYPES,
+    "js": ("function_declaration",),
+}
+
+# Call-site patterns: @call is a direct call, @method is obj.method()
+CALL_QUERY_PATTERNS: Dict[str, str] = {
+    "py": """
+        (call function: (identifier) @call)
+        (call function: (attribute attribute: (identifier) @method))
+    """,
+    "js": """
+        (call_expression function: (identifier) @call)
+        (call_expression function: (member_expression property: (property_identifier) @method))
+    """,
+    "cpp": "(call_expression function: (identifier) @call)",
+    "rust": "(call_expression function: (identifier) @call)",
+}
+
+# Import patterns. Captures: @module is used as-is, @quoted has its quotes
+# stripped, @header loses its "" or <> delimiters. @fn is only there for the
+# #eq? predicate, which the query engine checks before yielding a match.
+IMPORT_QUERY_PATTERNS: Dict[str, str] = {
+    "js": """
+        (import_statement source: (string) @quoted)
+        (call_expression
+            function: (identifier) @fn
+            arguments: (arguments . (string) @quoted)
+            (#eq? @fn "require"))
+    """,
+    "py": """
+        (import_statement name: (dotted_name) @module)
+        (import_from_statement module_name: (_) @module)
+    """,
+    "java": "(import_declaration [(scoped_identifier) (identifier)] @module)",
+    "cpp": "(preproc_include path: [(string_literal) (system_lib_string)] @header)",
+    "rust": "(use_declaration argument: [(scoped_identifier) (identifier) (use_list)] @module)",
 }
 
 
+def _node_types_pattern(lang: str, node_types, capture: str) -> str:
+    """Build a query pattern capturing every node whose type is in node_types.
+    Types the language's grammar doesn't know about are skipped."""
+    language = _LANG_CACHE[lang]
+    known = sorted(t for t in node_types if language.id_for_node_kind(t, True) is not None)
+    if not known:
+        return ""
+    return "[" + " ".join(f"({t})" for t in known) + f"] @{capture}"
+
+
+def _branch_pattern(lang: str) -> str:
+    """
+    Query pattern capturing every branch point counted by cyclomatic complexity.
+    Binary expressions only count for && / ||, and that check is part of the
+    pattern, so complexity is simply 1 + the number of captures.
+    """
+    language = _LANG_CACHE[lang]
+    pattern = _node_types_pattern(lang, COMPLEXITY_NODE_TYPES[lang] - {'binary_expression'}, "branch")
+    if 'binary_expression' in COMPLEXITY_NODE_TYPES[lang]:
+        operators = " ".join(
+            f'"{op}"' for op in sorted(LOGICAL_OPERATORS)
+            if language.id_for_node_kind(op, False) is not None
+        )
+        pattern += f" (binary_expression operator: [{operators}]) @branch"
+    return pattern
+
+
+def _compile_queries(lang: str) -> MappingProxyType:
+    """Compile every query the analyzer runs for one language."""
+    language = _LANG_CACHE[lang]
+    function_pattern = _node_types_pattern(lang, FUNCTION_TYPES[lang], "function")
+    import_pattern = IMPORT_QUERY_PATTERNS.get(lang, "")
+    return MappingProxyType({
+        "functions": Query(language, function_pattern),
+        "imports": Query(language, import_pattern),
+        # Function nodes and imports together, so file analysis runs one query per file
+        "file": Query(language, function_pattern + import_pattern),
+        # Branch points and call sites share one query, so a function body is scanned once
+        "body": Query(
+            language,
+            _branch_pattern(lang)
+            + CALL_QUERY_PATTERNS.get(lang, "")
+            + _node_types_pattern(lang, NESTED_FUNCTION_TYPES[lang], "nested"),
+        ),
+    })
+
+
+# Tree-sitter queries, compiled once per language at import and shared by every
+# file. Matching runs in C, so extractors only touch the nodes they care about.
+QUERIES: MappingProxyType = MappingProxyType({lang: _compile_queries(lang) for lang in _LANG_CACHE})
+
+
 # -------------------------------
 # Utils
 # -------------------------------
 
-def read_file(path: str) -> str:
+def read_file(path: str) -> bytes:
+    """Read a source file as raw bytes, ready to hand to tree-sitter.
+    Node offsets are byte offsets, so the source is never decoded as a whole."""
     try:
-        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        with open(path, "rb") as f:
             return f.read()
-    except:
-        return ""
+    except OSError:
+        return b""
+
+
+@lru_cache(maxsize=SOURCE_CACHE_SIZE)
+def _read_file_cached(path: str, mtime_ns: int, size: int) -> bytes:
+    """read_file memoized on the file's stat signature, so a changed file is re-read."""
+    return read_file(path)
+
+
+def read_file_cached(path: str) -> bytes:
+    """
+    Read a source file through a small LRU. Drilling into several functions of
+    one file then reads it once. Files over MAX_FILE_BYTES bypass the cache.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return b""
+    if st.st_size > MAX_FILE_BYTES:
+        return read_file(path)
+    return _read_file_cached(path, st.st_mtime_ns, st.st_size)
+
+
+@contextmanager
+def _open_source(path: str) -> Iterator[Union[bytes, mmap.mmap]]:
+    """
+    Yield a file's raw source for parsing. Large files are memory-mapped, so
+    tree-sitter reads the page cache directly and only the spans we slice
+    out are ever copied. The mapping is closed when the block exits.
+    """
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        size = 0
+    if size < MMAP_MIN_BYTES:
+        yield read_file(path)
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        yield mm
+
+
+def _looks_minified(code: Union[bytes, mmap.mmap]) -> bool:
+    """True if one of the first MINIFIED_SAMPLE_LINES lines exceeds MINIFIED_LINE_LENGTH."""
+    start = 0
+    for _ in range(MINIFIED_SAMPLE_LINES):
+        end = code.find(b"\n", start, start + MINIFIED_LINE_LENGTH + 1)
+        if end == -1:
+            # No newline within the limit: long line, unless the file ends first
+            return len(code) - start > MINIFIED_LINE_LENGTH
+        start = end + 1
+    return False
+
+
+def _count_lines(code: Union[bytes, mmap.mmap]) -> int:
+    """Count lines without copying an mmap into a bytes object"""
+    if isinstance(code, bytes):
+        return code.count(b"\n") + 1
+    lines = 1
+    pos = code.find(b"\n")
+    while pos != -1:
+        lines += 1
+        pos = code.find(b"\n", pos + 1)
+    return lines
 
 
 def detect_language(path: str) -> Optional[str]:
-    ext = os.path.splitext(path)[1].lower()
-    if ext in [".js", ".jsx", ".ts", ".tsx"]:
-        return "js"
-    if ext in [".py"]:
-        return "py"
-    if ext in [".java"]:
-        return "java"
-    if ext in [".cpp", ".cc", ".cxx", ".h", ".hpp"]:
-        return "cpp"
-    if ext in [".rs"]:
-        return "rust"
-    return None
+    return EXTENSION_TO_LANG.get(os.path.splitext(path)[1].lower())
 
 
 def get_language_for_parser(lang: str):
-    """Get the tree-sitter Language object using the new v0.25 API"""
-    lang_capsules = {
-        "js": tree_sitter_javascript.language(),
-        "py": tree_sitter_python.language(),
-        "java": tree_sitter_java.language(),
-        "cpp": tree_sitter_cpp.language(),
-        "rust": tree_sitter_rust.language(),
-    }
-    capsule = lang_capsules.get(lang)
-    if capsule:
-        return Language(capsule)
-    return None
+    """Get the cached tree-sitter Language object for a language key"""
+    return _LANG_CACHE.get(lang)
+
 
+def _get_parser(lang: str) -> Parser:
+    """Return this thread's Parser for lang, creating it on first use.
 
-def get_node_text(node: Node, code: str) -> str:
-    """Extract text from a tree-sitter node"""
-    return code[node.start_byte:node.end_byte]
+    A Parser is not safe to share between threads, and switching its
+    language per file is wasted work, so each thread keeps one per language.
+
+    Invariant: a parser is built once and after that only parse() is called
+    on it, so its internal stacks are allocated once and reused across
+    files. Pool worker processes start with an empty pool of their own.
+    Callers must not change parser.language or hand a parser to another
+    thread.
+    """
+    parsers = getattr(_TLS, "parsers", None)
+    if parsers is None:
+        parsers = _TLS.parsers = {}
+    parser = parsers.get(lang)
+    if parser is None:
+        parser = parsers[lang] = Parser(_LANG_CACHE[lang])
+    return parser
+
+
+def iter_tree(node: Node, prune: Tuple[str, ...] = ()) -> Iterator[Node]:
+    """
+    Pre-order traversal of node's subtree driven by a single TreeCursor,
+    so no per-node children list is built. Descendants whose type is in
+    prune are yielded but not descended into.
+    """
+    cursor = node.walk()
+    yield cursor.node
+    if not cursor.goto_first_child():
+        return
+    while True:
+        current = cursor.node
+        yield current
+        if current.type not in prune and cursor.goto_first_child():
+            continue
+        while not cursor.goto_next_sibling():
+            if not cursor.goto_parent():
+                return
+
+
+def get_node_text(node: Node, code: bytes) -> str:
+    """Extract text from a tree-sitter node.
+    Node offsets are byte offsets, so slice the raw source and decode only the span."""
+    return code[node.start_byte:node.end_byte].decode("utf-8", "ignore")
 
 
 # -------------------------------
-# Cyclomatic Complexity Calculator
+# Function Body Analysis
 # -------------------------------
 
-def calculate_complexity(node: Node, code: str, lang: str) -> int:
+def _nested_range_test(node: Node, nested: List[Node]):
+    """
+    Build a byte-offset test for "inside a function nested in node".
+    Only the outermost nested ranges are kept, so each test is one bisect.
+    """
+    starts: List[int] = []
+    ends: List[int] = []
+    for n in sorted(nested, key=lambda n: (n.start_byte, -n.end_byte)):
+        if n == node or (ends and n.end_byte <= ends[-1]):
+            continue
+        starts.append(n.start_byte)
+        ends.append(n.end_byte)
+
+    if not starts:
+        return lambda offset: False
+
+    def test(offset: int) -> bool:
+        i = bisect_right(starts, offset) - 1
+        return i >= 0 and offset < ends[i]
+
+    return test
+
+
+def _walk_function_body(node: Node, code: bytes, lang: str, own_name: str) -> Tuple[int, List[str]]:
     """
-    Calculate cyclomatic complexity using AST traversal.
-    More accurate than regex as it understands code structure.
+    Single pass over a function body that yields both its cyclomatic
+    complexity and the functions it calls (recursion into own_name is skipped).
     """
-    complexity = 1  # Base complexity
+    calls = set()
+
+    captures = QueryCursor(QUERIES[lang]["body"]).captures(node)
+
+    # Base complexity of 1, plus one per branch point matched by the query
+    complexity = 1 + len(captures.get("branch", []))
+
+    in_nested = _nested_range_test(node, captures.get("nested", []))
 
-    def walk(n: Node):
-        nonlocal complexity
+    # Direct function calls
+    for func_node in captures.get("call", []):
+        if in_nested(func_node.start_byte):
+            continue
+        func_name = get_node_text(func_node, code)
+        if func_name != own_name and func_name not in BUILTIN_CALLS:
+            calls.add(sys.intern(func_name))
 
-        # Check if this node type increases complexity
-        if n.type in COMPLEXITY_NODE_TYPES:
-            # For binary expressions, only count && and ||
-            if n.type == 'binary_expression':
-                operator_node = None
-                for child in n.children:
-                    if child.type in ['&&', '||', 'and', 'or']:
-                        complexity += 1
-                        break
-                    # Also check for operator text
-                    text = get_node_text(child, code)
-                    if text in ['&&', '||', 'and', 'or']:
-                        complexity += 1
-                        break
-            elif n.type == 'boolean_operator':
-                # Python's and/or
-                complexity += 1
-            else:
-                complexity += 1
+    # Method calls (obj.method())
+    for method_node in captures.get("method", []):
+        if in_nested(method_node.start_byte):
+            continue
+        method_name = get_node_text(method_node, code)
+        if method_name not in BUILTIN_CALLS:
+            calls.add(sys.intern(method_name))
 
-        for child in n.children:
-            walk(child)
+    return complexity, sorted(calls)
 
-    walk(node)
-    return complexity
+
+def calculate_complexity(node: Node, code: bytes, lang: str) -> int:
+    """Calculate cyclomatic complexity of a function node using the AST."""
+    return _walk_function_body(node, code, lang, "")[0]
+
+
+def extract_function_calls(node: Node, code: bytes, lang: str, exclude_names=frozenset()) -> List[str]:
+    """Extract the functions called from a function body using the AST."""
+    calls = _walk_function_body(node, code, lang, "")[1]
+    return [c for c in calls if c not in exclude_names]
 
 
 # -------------------------------
 # Function Detail Extractor
 # -------------------------------
 
-def extract_function_details(node: Node, code: str, lang: str, file_path: str) -> Dict[str, Any]:
+Signature = Tuple[str, List[str], Optional[str]]
+
+
+def _field_text(node: Node, field: str, code: bytes) -> Optional[str]:
+    """Text of a named field child, or None if the node has no such field."""
+    child = node.child_by_field_name(field)
+    return get_node_text(child, code) if child is not None else None
+
+
+def _identifier_name(node: Optional[Node], code: bytes) -> str:
+    """Text of node if it is a plain identifier, otherwise empty."""
+    if node is not None and node.type == "identifier":
+        return sys.intern(get_node_text(node, code))
+    return ""
+
+
+def _param_texts(params: Optional[Node], code: bytes, kinds: Tuple[str, ...]) -> List[str]:
+    """Source text of each parameter node whose type is in kinds."""
+    if params is None:
+        return []
+    return [get_node_text(p, code) for p in params.children if p.type in kinds]
+
+
+def _python_signature(node: Node, code: bytes) -> Signature:
+    """Python: function_definition -> name, parameters, return_type"""
+    parameters = []
+    params = node.child_by_field_name("parameters")
+    for param in params.children if params is not None else ():
+        param_kind = param.type
+        if param_kind == "identifier":
+            parameters.append(get_node_text(param, code))
+        elif param_kind == "typed_parameter":
+            # The grammar gives typed_parameter no "name" field
+            param_name = get_node_text(param.named_children[0], code)
+            parameters.append(f"{param_name}: {_field_text(param, 'type', code)}")
+        elif param_kind == "default_parameter":
+            parameters.append(f"{_field_text(param, 'name', code)}=...")
+    return (
+        _identifier_name(node.child_by_field_name("name"), code),
+        parameters,
+        _field_text(node, "return_type", code),
+    )
+
+
+def _javascript_signature(node: Node, code: bytes) -> Signature:
+    """JavaScript: function_declaration, arrow_function, etc."""
+    return (
+        _identifier_name(node.child_by_field_name("name"), code),
+        _param_texts(node.child_by_field_name("parameters"), code,
+                     ("identifier", "assignment_pattern", "rest_pattern")),
+        None,
+    )
+
+
+def _java_signature(node: Node, code: bytes) -> Signature:
+    """Java: method_declaration, constructor_declaration"""
+    return (
+        _identifier_name(node.child_by_field_name("name"), code),
+        _param_texts(node.child_by_field_name("parameters"), code, ("formal_parameter",)),
+        _field_text(node, "type", code),
+    )
+
+
+def _cpp_signature(node: Node, code: bytes) -> Signature:
+    """C++: function_definition -> function_declarator"""
+    declarator = node.child_by_field_name("declarator")
+    if declarator is None or declarator.type != "function_declarator":
+        return "", [], _field_text(node, "type", code)
+    return (
+        _identifier_name(declarator.child_by_field_name("declarator"), code),
+        _param_texts(declarator.child_by_field_name("parameters"), code, ("parameter_declaration",)),
+        _field_text(node, "type", code),
+    )
+
+
+def _rust_signature(node: Node, code: bytes) -> Signature:
+    """Rust: function_item"""
+    return (
+        _identifier_name(node.child_by_field_name("name"), code),
+        _param_texts(node.child_by_field_name("parameters"), code, ("parameter",)),
+        _field_text(node, "return_type", code),
+    )
+
+
+# Signature extractors read grammar fields, so each is a few C lookups
+_SIGNATURE_EXTRACTORS: Dict[str, Callable[[Node, bytes], Signature]] = {
+    "py": _python_signature,
+    "js": _javascript_signature,
+    "java": _java_signature,
+    "cpp": _cpp_signature,
+    "rust": _rust_signature,
+}
+
+
+def extract_function_details(node: Node, code: bytes, lang: str, file_path: str) -> Dict[str, Any]:
     """
     Extract detailed function information from a function AST node.
     Returns: functionName, parameters, returns, complexity, startLine, endLine, code
     """
-    func_name = ""
-    parameters = []
-    return_type = None
-    
-    # Extract function name and parameters based on language
-    if lang == "py":
-        # Python: function_definition -> name, parameters, return_type
-        for child in node.children:
-            if child.type == "identifier":
-                func_name = get_node_text(child, code)
-            elif child.type == "parameters":
-                # Extract individual parameters
-                for param in child.children:
-                    if param.type in ["identifier", "typed_parameter", "default_parameter"]:
-                        param_text = get_node_text(param, code)
-                        # Clean up typed parameters
-                        if ":" in param_text:
-                            param_name = param_text.split(":")[0].strip()
-                            param_type = param_text.split(":")[1].strip().split("=")[0].strip()
-                            parameters.append(f"{param_name}: {param_type}")
-                        elif "=" in param_text:
-                            param_name = param_text.split("=")[0].strip()
-                            parameters.append(f"{param_name}=...")
-                        else:
-                            parameters.append(param_text)
-            elif child.type == "type":
-                return_type = get_node_text(child, code)
-                
-    elif lang == "js":
-        # JavaScript: function_declaration, arrow_function, etc.
-        for child in node.children:
-            if child.type == "identifier":
-                func_name = get_node_text(child, code)
-            elif child.type == "formal_parameters":
-                for param in child.children:
-                    if param.type in ["identifier", "assignment_pattern", "rest_pattern"]:
-                        parameters.append(get_node_text(param, code))
-                        
-    elif lang == "java":
-        # Java: method_declaration
-        for child in node.children:
-            if child.type == "identifier":
-                func_name = get_node_text(child, code)
-            elif child.type == "formal_parameters":
-                for param in child.children:
-                    if param.type == "formal_parameter":
-                        parameters.append(get_node_text(param, code))
-            elif child.type in ["type_identifier", "generic_type", "void_type"]:
-                return_type = get_node_text(child, code)
-                
-    elif lang == "cpp":
-        # C++: function_definition -> function_declarator
-        for child in node.children:
-            if child.type == "function_declarator":
-                for subchild in child.children:
-                    if subchild.type == "identifier":
-                        func_name = get_node_text(subchild, code)
-                    elif subchild.type == "parameter_list":
-                        for param in subchild.children:
-                            if param.type == "parameter_declaration":
-                                parameters.append(get_node_text(param, code))
-            elif child.type in ["type_identifier", "primitive_type"]:
-                return_type = get_node_text(child, code)
-                
-    elif lang == "rust":
-        # Rust: function_item
-        for child in node.children:
-            if child.type == "identifier":
-                func_name = get_node_text(child, code)
-            elif child.type == "parameters":
-                for param in child.children:
-                    if param.type == "parameter":
-                        parameters.append(get_node_text(param, code))
-            elif child.type == "type_identifier":
-                return_type = get_node_text(child, code)
-
-    # Calculate complexity for this function
-    complexity = calculate_complexity(node, code, lang)
+    extract_signature = _SIGNATURE_EXTRACTORS.get(lang)
+    if extract_signature:
+        func_name, parameters, return_type = extract_signature(node, code)
+    else:
+        func_name, parameters, return_type = "", [], None
+
+    # Complexity and outgoing calls come from one walk of the body
+    complexity, calls = _walk_function_body(node, code, lang, func_name)
     
     # Get line numbers (1-indexed for user display)
     start_line = node.start_point[0] + 1
@@ -275,280 +643,147 @@ def extract_function_details(node: Node, code: str, lang: str, file_path: str) -
         "endLine": end_line,
         "lines": end_line - start_line + 1,
         "code": func_code,
-        "calls": []  # Will be populated separately
+        "calls": calls
     }
 
 
 # -------------------------------
-# Function Call Extractor
+# Import Extractor
 # -------------------------------
 
-def extract_function_calls(node: Node, code: str, exclude_names: set) -> List[str]:
-    """
-    Extract function calls from a function body using AST.
-    More accurate than regex as it only detects actual call expressions.
-    """
-    calls = set()
-    
-    # Built-in functions to exclude
-    builtins = {
-        # Python
-        'print', 'len', 'str', 'int', 'float', 'list', 'dict', 'set', 'tuple',
-        'range', 'open', 'type', 'isinstance', 'hasattr', 'getattr', 'setattr',
-        'super', 'map', 'filter', 'zip', 'enumerate', 'sorted', 'reversed',
-        'min', 'max', 'sum', 'abs', 'round', 'format', 'input', 'bool', 'bytes',
-        # JavaScript
-        'console', 'require', 'import', 'export', 'setTimeout', 'setInterval',
-        'clearTimeout', 'clearInterval', 'fetch', 'Promise', 'Array', 'Object',
-        'String', 'Number', 'Boolean', 'JSON', 'Math', 'Date', 'RegExp', 'Error',
-        # Java
-        'System', 'println', 'print', 'new', 'toString', 'equals', 'hashCode',
-        # C++
-        'std', 'cout', 'cin', 'printf', 'scanf', 'sizeof', 'malloc', 'free',
-        # Rust
-        'println', 'print', 'vec', 'Some', 'None', 'Ok', 'Err', 'Box', 'Rc', 'Arc',
-        # Control flow keywords that look like calls
-        'if', 'for', 'while', 'switch', 'catch', 'match',
-    }
-    
-    def walk(n: Node):
-        if n.type == "call_expression":
-            # Get the function being called
-            if n.children:
-                func_node = n.children[0]
-                # Handle direct function calls
-                if func_node.type == "identifier":
-                    func_name = get_node_text(func_node, code)
-                    if func_name not in builtins and func_name not in exclude_names:
-                        calls.add(func_name)
-                # Handle method calls (obj.method())
-                elif func_node.type == "member_expression":
-                    # Get the method name
-                    for child in func_node.children:
-                        if child.type == "property_identifier":
-                            method_name = get_node_text(child, code)
-                            if method_name not in builtins:
-                                calls.add(method_name)
-        
-        # Python: different node type for calls
-        elif n.type == "call":
-            if n.children:
-                func_node = n.children[0]
-                if func_node.type == "identifier":
-                    func_name = get_node_text(func_node, code)
-                    if func_name not in builtins and func_name not in exclude_names:
-                        calls.add(func_name)
-                elif func_node.type == "attribute":
-                    # Get the attribute name (method being called)
-                    for child in func_node.children:
-                        if child.type == "identifier":
-                            method_name = get_node_text(child, code)
-                            if method_name not in builtins:
-                                calls.add(method_name)
-                                break  # Take the last identifier as the method name
-        
-        for child in n.children:
-            walk(child)
-    
-    walk(node)
-    return list(calls)
+def _imports_from_captures(captures: Dict[str, List[Node]], code: bytes) -> List[str]:
+    """Turn import query captures into module names, in source order."""
+    found = []
+    for node in captures.get("module", ()):
+        found.append((node.start_byte, sys.intern(get_node_text(node, code))))
+    for node in captures.get("quoted", ()):
+        found.append((node.start_byte, sys.intern(get_node_text(node, code)[1:-1])))
+    for node in captures.get("header", ()):
+        found.append((node.start_byte, sys.intern(get_node_text(node, code).strip('"<>'))))
 
+    found.sort(key=lambda item: item[0])
+    return [module for _, module in found]
 
-# -------------------------------
-# Import Extractors (existing, kept for compatibility)
-# -------------------------------
 
-def extract_js_imports(tree, code):
-    imports = []
+def _function_nodes(captures: Dict[str, List[Node]]) -> List[Node]:
+    """Function captures in source order, outer before inner."""
+    # Captures come back grouped, not in source order
+    nodes = captures.get("function", [])
+    nodes.sort(key=lambda n: (n.start_byte, -n.end_byte))
+    return nodes
 
-    def walk(node):
-        if node.type == "import_statement":
-            for child in node.children:
-                if child.type == "string":
-                    module = code[child.start_byte+1 : child.end_byte-1]
-                    imports.append(module)
 
-        if node.type == "call_expression":
-            if len(node.children) >= 2 and node.children[0].type == "identifier":
-                fn = code[node.children[0].start_byte:node.children[0].end_byte]
-                if fn == "require":
-                    arg = node.children[1]
-                    if arg.type == "arguments" and len(arg.children) >= 2:
-                        mod_node = arg.children[1]
-                        if mod_node.type == "string":
-                            module = code[mod_node.start_byte+1 : mod_node.end_byte-1]
-                            imports.append(module)
+def extract_imports(tree, code: bytes, lang: str) -> List[str]:
+    """Extract imported modules in source order using the language's import query."""
+    if lang not in QUERIES:
+        return []
+    query = QUERIES[lang]["imports"]
+    return _imports_from_captures(QueryCursor(query).captures(tree.root_node), code)
 
-        for c in node.children:
-            walk(c)
 
-    walk(tree.root_node)
-    return imports
+# Per-language wrappers, kept for compatibility
+def extract_js_imports(tree, code):
+    return extract_imports(tree, code, "js")
 
 
 def extract_py_imports(tree, code):
-    imports = []
-
-    def walk(node):
-        if node.type == "import_statement":
-            for child in node.children:
-                if child.type == "dotted_name" or child.type == "identifier":
-                    module = code[child.start_byte : child.end_byte]
-                    imports.append(module)
-
-        if node.type == "import_from_statement":
-            if len(node.children) > 1:
-                module = code[node.children[1].start_byte : node.children[1].end_byte]
-                imports.append(module)
-
-        for c in node.children:
-            walk(c)
-
-    walk(tree.root_node)
-    return imports
+    return extract_imports(tree, code, "py")
 
 
 def extract_java_imports(tree, code):
-    imports = []
-
-    def walk(node):
-        if node.type == "import_declaration":
-            for child in node.children:
-                if child.type == "scoped_identifier" or child.type == "identifier":
-                    module = code[child.start_byte : child.end_byte]
-                    imports.append(module)
-
-        for c in node.children:
-            walk(c)
-
-    walk(tree.root_node)
-    return imports
+    return extract_imports(tree, code, "java")
 
 
 def extract_cpp_imports(tree, code):
-    imports = []
-
-    def walk(node):
-        if node.type == "preproc_include":
-            for child in node.children:
-                if child.type == "string_literal" or child.type == "system_lib_string":
-                    header = code[child.start_byte : child.end_byte]
-                    header = header.strip('"<>')
-                    imports.append(header)
-
-        for c in node.children:
-            walk(c)
-
-    walk(tree.root_node)
-    return imports
+    return extract_imports(tree, code, "cpp")
 
 
 def extract_rust_imports(tree, code):
-    imports = []
-
-    def walk(node):
-        if node.type == "use_declaration":
-            for child in node.children:
-                if child.type == "scoped_identifier" or child.type == "identifier":
-                    module = code[child.start_byte : child.end_byte]
-                    imports.append(module)
-                elif child.type == "use_list":
-                    module_text = code[child.start_byte : child.end_byte]
-                    imports.append(module_text)
-
-        for c in node.children:
-            walk(c)
-
-    walk(tree.root_node)
-    return imports
+    return extract_imports(tree, code, "rust")
 
 
 # -------------------------------
 # Enhanced Function Extractor
 # -------------------------------
 
-def extract_functions_detailed(tree, code: str, lang: str, file_path: str) -> List[Dict[str, Any]]:
+def _function_details(nodes: List[Node], code: bytes, lang: str, file_path: str) -> List[Dict[str, Any]]:
+    """Details for each named function node; anonymous ones are dropped."""
+    functions = []
+    for node in nodes:
+        func_details = extract_function_details(node, code, lang, file_path)
+        if func_details["name"]:  # Only add if we found a name
+            functions.append(func_details)
+    return functions
+
+
+def _function_names(nodes: List[Node], code: bytes, lang: str) -> List[str]:
+    """Names of the named function nodes, without the body analysis."""
+    extract_signature = _SIGNATURE_EXTRACTORS[lang]
+    names = (extract_signature(node, code)[0] for node in nodes)
+    return [name for name in names if name]
+
+
+def extract_functions_detailed(tree, code: bytes, lang: str, file_path: str) -> List[Dict[str, Any]]:
     """
     Extract all functions with detailed metadata using AST.
     Returns list of function details including complexity, parameters, etc.
     """
-    functions = []
-    
-    # Define function node types for each language
-    function_types = {
-        "py": ["function_definition"],
-        "js": ["function_declaration", "arrow_function", "function_expression", "method_definition"],
-        "java": ["method_declaration", "constructor_declaration"],
-        "cpp": ["function_definition"],
-        "rust": ["function_item"],
-    }
-    
-    target_types = function_types.get(lang, [])
-    
-    def walk(node: Node):
-        if node.type in target_types:
-            func_details = extract_function_details(node, code, lang, file_path)
-            if func_details["name"]:  # Only add if we found a name
-                # Extract calls from this function
-                func_details["calls"] = extract_function_calls(node, code, {func_details["name"]})
-                functions.append(func_details)
-        
-        for child in node.children:
-            walk(child)
-    
-    walk(tree.root_node)
-    return functions
+    if lang not in QUERIES:
+        return []
+    query = QUERIES[lang]["functions"]
+    nodes = _function_nodes(QueryCursor(query).captures(tree.root_node))
+    return _function_details(nodes, code, lang, file_path)
 
 
 # Backward compatibility wrapper
-def extract_functions(tree, code) -> List[str]:
+def extract_functions(tree, code, lang: Optional[str] = None) -> List[str]:
     """Legacy function for backward compatibility - returns just function names"""
-    functions = []
+    if lang is None:
+        lang = next((k for k, language in _LANG_CACHE.items() if language == tree.language), None)
+    if lang not in QUERIES:
+        return []
+    query = QUERIES[lang]["functions"]
+    return _function_names(_function_nodes(QueryCursor(query).captures(tree.root_node)), code, lang)
 
-    def walk(node):
-        if node.type == "function_declaration":
-            for child in node.children:
-                if child.type == "identifier":
-                    fn = code[child.start_byte:child.end_byte]
-                    functions.append(fn)
-
-        if node.type == "function_definition":
-            for child in node.children:
-                if child.type == "identifier":
-                    fn = code[child.start_byte:child.end_byte]
-                    functions.append(fn)
-
-        if node.type == "method_declaration":
-            for child in node.children:
-                if child.type == "identifier":
-                    fn = code[child.start_byte:child.end_byte]
-                    functions.append(fn)
-
-        if node.type == "function_definition":
-            for child in node.children:
-                if child.type == "function_declarator":
-                    for subchild in child.children:
-                        if subchild.type == "identifier":
-                            fn = code[subchild.start_byte:subchild.end_byte]
-                            functions.append(fn)
-
-        if node.type == "function_item":
-            for child in node.children:
-                if child.type == "identifier":
-                    fn = code[child.start_byte:child.end_byte]
-                    functions.append(fn)
-
-        for c in node.children:
-            walk(c)
-
-    walk(tree.root_node)
-    return functions
+
+def scan_file(tree, code: bytes, lang: str) -> Tuple[List[Node], List[str]]:
+    """
+    One query pass over a file: returns its function nodes (source order,
+    outer before inner) and its imported modules (source order).
+    """
+    captures = QueryCursor(QUERIES[lang]["file"]).captures(tree.root_node)
+    return _function_nodes(captures), _imports_from_captures(captures, code)
 
 
 # -------------------------------
 # Single File Analysis (Enhanced)
 # -------------------------------
 
+def analyze_source(code: Union[bytes, mmap.mmap], lang: str, file_path: str, language_name: str) -> Dict[str, Any]:
+    """
+    Analyze source that is already in memory. file_path is only used for
+    display and function ids, so the code need not come from disk.
+    """
+    tokens = PREFILTER_TOKENS.get(lang)
+    if tokens and all(code.find(token) == -1 for token in tokens):
+        imports, functions = [], []
+    else:
+        tree = _get_parser(lang).parse(code)
+
+        # Function nodes and imports come from a single query pass
+        function_nodes, imports = scan_file(tree, code, lang)
+        functions = _function_details(function_nodes, code, lang, file_path)
+
+    return {
+        "filePath": file_path,
+        "language": language_name,
+        "imports": imports,
+        "listOfFunctions": functions,
+        "totalLines": _count_lines(code),
+        "totalFunctions": len(functions),
+    }
+
+
 def analyze_file_detailed(path: str, base_path: str = "") -> Optional[Dict[str, Any]]:
     """
     Analyze a single file with full function details.
@@ -558,89 +793,59 @@ def analyze_file_detailed(path: str, base_path: str = "") -> Optional[Dict[str,
     if not lang:
         return None
 
-    code = read_file(path)
-    if not code.strip():
-        return None
-
-    # Set language for parser
-    language = get_language_for_parser(lang)
-    if not language:
+    # Bail out early for languages without a grammar
+    if get_language_for_parser(lang) is None:
         return None
-    
-    parser.language = language
-    tree = parser.parse(bytes(code, "utf-8"))
 
     # Get relative path for display
     if base_path:
         rel_path = os.path.relpath(path, base_path)
     else:
         rel_path = path
+    language_name = SUPPORTED_EXTENSIONS.get(os.path.splitext(path)[1].lower(), "unknown")
 
-    # Extract detailed function information
-    functions = extract_functions_detailed(tree, code, lang, rel_path)
-
-    # Extract imports
-    if lang == "js":
-        imports = extract_js_imports(tree, code)
-    elif lang == "py":
-        imports = extract_py_imports(tree, code)
-    elif lang == "java":
-        imports = extract_java_imports(tree, code)
-    elif lang == "cpp":
-        imports = extract_cpp_imports(tree, code)
-    elif lang == "rust":
-        imports = extract_rust_imports(tree, code)
-    else:
-        imports = []
-
-    return {
-        "filePath": rel_path,
-        "language": SUPPORTED_EXTENSIONS.get(os.path.splitext(path)[1].lower(), "unknown"),
-        "imports": imports,
-        "listOfFunctions": functions,
-        "totalLines": len(code.split('\n')),
-        "totalFunctions": len(functions),
-    }
+    with _open_source(path) as code:
+        # Mapped files are large by definition, so only small reads need the blank check
+        if isinstance(code, bytes) and not code.strip():
+            return None
+        if _looks_minified(code):
+            return None
+        return analyze_source(code, lang, rel_path, language_name)
 
 
 def analyze_file(path: str) -> Optional[Dict[str, Any]]:
-    """Legacy function for backward compatibility"""
+    """
+    Legacy function for backward compatibility.
+    Results are cached by content, so an unchanged file is parsed once per process.
+    """
     lang = detect_language(path)
-    if not lang:
+    if not lang or get_language_for_parser(lang) is None:
         return None
 
     code = read_file(path)
-    if not code.strip():
-        return None
-
-    language = get_language_for_parser(lang)
-    if not language:
+    if not code.strip() or _looks_minified(code):
         return None
-    
-    parser.language = language
-    tree = parser.parse(bytes(code, "utf-8"))
-
-    # Extract imports
-    if lang == "js":
-        imports = extract_js_imports(tree, code)
-    elif lang == "py":
-        imports = extract_py_imports(tree, code)
-    elif lang == "java":
-        imports = extract_java_imports(tree, code)
-    elif lang == "cpp":
-        imports = extract_cpp_imports(tree, code)
-    elif lang == "rust":
-        imports = extract_rust_imports(tree, code)
-    else:
-        imports = []
-
-    # Extract functions
-    functions = extract_functions(tree, code)
 
+    key = (lang, hashlib.blake2b(code, digest_size=16).digest())
+    with _CONTENT_CACHE_LOCK:
+        cached = _CONTENT_CACHE.get(key)
+        if cached is not None:
+            _CONTENT_CACHE.move_to_end(key)
+
+    if cached is None:
+        tree = _get_parser(lang).parse(code)
+        function_nodes, imports = scan_file(tree, code, lang)
+        cached = (imports, _function_names(function_nodes, code, lang))
+        with _CONTENT_CACHE_LOCK:
+            _CONTENT_CACHE[key] = cached
+            if len(_CONTENT_CACHE) > CONTENT_CACHE_SIZE:
+                _CONTENT_CACHE.popitem(last=False)
+
+    imports, functions = cached
     return {
         "file": path,
-        "imports": imports,
-        "functions": functions
+        "imports": list(imports),
+        "functions": list(functions)
     }
 
 
@@ -648,6 +853,20 @@ def analyze_file(path: str) -> Optional[Dict[str, Any]]:
 # Extract Function Code by Name
 # -------------------------------
 
+def _declares_name(node: Node, code: bytes, function_name: str) -> bool:
+    """Check whether a function node is named function_name."""
+    for child in node.children:
+        child_type = child.type
+        if child_type == "identifier":
+            if get_node_text(child, code) == function_name:
+                return True
+        elif child_type == "function_declarator":
+            for subchild in child.children:
+                if subchild.type == "identifier" and get_node_text(subchild, code) == function_name:
+                    return True
+    return False
+
+
 def get_function_code(file_path: str, function_name: str) -> Optional[str]:
     """
     Get the source code of a specific function by name.
@@ -657,143 +876,413 @@ def get_function_code(file_path: str, function_name: str) -> Optional[str]:
     if not lang:
         return None
 
-    code = read_file(file_path)
-    if not code.strip():
+    code = read_file_cached(file_path)
+    # Names are read from the source, so a file that doesn't contain the
+    # name at all can't define it; skip the parse
+    if function_name.encode() not in code:
         return None
 
-    language = get_language_for_parser(lang)
-    if not language:
+    if get_language_for_parser(lang) is None:
         return None
     
-    parser.language = language
-    tree = parser.parse(bytes(code, "utf-8"))
-
-    # Define function node types for each language
-    function_types = {
-        "py": ["function_definition"],
-        "js": ["function_declaration", "arrow_function", "function_expression", "method_definition"],
-        "java": ["method_declaration", "constructor_declaration"],
-        "cpp": ["function_definition"],
-        "rust": ["function_item"],
-    }
-    
-    target_types = function_types.get(lang, [])
+    parser = _get_parser(lang)
+    tree = parser.parse(code)
+
+    target_types = FUNCTION_TYPES.get(lang, ())
+
+    # Search outside function bodies first: most lookups are for top-level
+    # functions or methods, and bodies hold most of a file's nodes. Bodies
+    # of non-matching functions are only searched if that comes up empty.
+    scopes = [tree.root_node]
+    while scopes:
+        nested = []
+        for scope in scopes:
+            nodes = iter_tree(scope, prune=target_types)
+            next(nodes)  # the scope itself
+            for node in nodes:
+                if node.type not in target_types:
+                    continue
+                if _declares_name(node, code, function_name):
+                    return get_node_text(node, code)
+                nested.append(node)
+        scopes = nested
     
-    def find_function(node: Node) -> Optional[str]:
-        if node.type in target_types:
-            # Check if this is the function we're looking for
-            for child in node.children:
-                if child.type == "identifier":
-                    name = get_node_text(child, code)
-                    if name == function_name:
-                        return get_node_text(node, code)
-                elif child.type == "function_declarator":
-                    for subchild in child.children:
-                        if subchild.type == "identifier":
-                            name = get_node_text(subchild, code)
-                            if name == function_name:
-                                return get_node_text(node, code)
-        
-        for child in node.children:
-            result = find_function(child)
-            if result:
-                return result
-        
-        return None
-    
-    return find_function(tree.root_node)
+    return None
 
 
 # -------------------------------
 # Analyze whole repository (Enhanced)
 # -------------------------------
 
+def _scan_directory(path: str) -> Tuple[List[str], List[str]]:
+    """
+    List a single directory, returning (source files, subdirectories to descend into).
+    DirEntry caches the file type, so only candidate source files are stat'ed,
+    to drop empty files and ones over MAX_FILE_BYTES before anything reads them.
+    """
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                name = entry.name
+                if name.startswith('.'):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if name not in IGNORED_DIRECTORIES:
+                        subdirs.append(entry.path)
+                elif (lower := name.lower()).endswith(_SUPPORTED_SUFFIXES) and ".min." not in lower and entry.is_file():
+                    try:
+                        size = entry.stat().st_size
+                    except OSError:
+                        continue
+                    if 0 < size <= MAX_FILE_BYTES:
+                        files.append(entry.path)
+    except OSError:
+        pass
+    return files, subdirs
+
+
+def iter_source_files(repo_path: str) -> Iterator[str]:
+    """
+    Yield source files in the repository, respecting ignore rules, as each
+    directory level is scanned. Consumers can start on the first files
+    while deeper levels are still being listed.
+    """
+    # Breadth-first: every directory on a level is scanned concurrently,
+    # which overlaps disk latency (scandir releases the GIL)
+    level = [repo_path]
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as executor:
+        while level:
+            next_level = []
+            for files, subdirs in executor.map(_scan_directory, level):
+                yield from files
+                next_level.extend(subdirs)
+            level = next_level
+
+
 def find_source_files(repo_path: str) -> List[str]:
     """Find all source code files in the repository, respecting ignore rules."""
-    source_files = []
-    
-    for root, dirs, files in os.walk(repo_path):
-        # Skip ignored directories (modifies dirs in-place to prevent descending)
-        dirs[:] = [d for d in dirs if d not in IGNORED_DIRECTORIES and not d.startswith('.')]
-        
-        for f in files:
-            if f.startswith('.'):
-                continue
-            ext = os.path.splitext(f)[1].lower()
-            if ext in SUPPORTED_EXTENSIONS:
-                file_path = os.path.join(root, f)
-                source_files.append(file_path)
+    return list(iter_source_files(repo_path))
+
+
+def _cache_file(path: str, base_path: str, cache_dir: str) -> Optional[str]:
+    """Cache entry for path's current contents, or None if it can't be read.
+    Settings that decide whether a file is analyzed at all are part of the key."""
+    rel_path = os.path.relpath(path, base_path) if base_path else path
+    key = hashlib.blake2b(f"{CACHE_VERSION}:{MINIFIED_LINE_LENGTH}:{MINIFIED_SAMPLE_LINES}:".encode(), digest_size=20)
+    key.update(os.fsencode(rel_path))
+    key.update(b"\0")
+    try:
+        with _open_source(path) as code:
+            key.update(code)
+    except OSError:
+        return None
+    return os.path.join(cache_dir, key.hexdigest())
+
+
+def _analyze_one(path: str, base_path: str = "", cache_dir: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """Process-pool worker: analyze a single file, never raising.
+    Returns (result, whether it came from the cache)."""
+    cache_file = _cache_file(path, base_path, cache_dir) if cache_dir else None
+    if cache_file:
+        try:
+            with open(cache_file, "rb") as f:
+                result = orjson.loads(f.read())
+            # Refresh the entry so prune_cache evicts least recently used first
+            os.utime(cache_file)
+            return result, True
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[Analyzer] Ignoring unreadable cache entry for {path}: {e}")
+
+    try:
+        result = analyze_file_detailed(path, base_path)
+    except Exception as e:
+        print(f"[Analyzer] Failed to analyze {path}: {e}")
+        return None, False
+
+    if cache_file:
+        # Write-then-rename so a concurrent reader never sees a partial entry
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_file, "wb") as f:
+                f.write(orjson.dumps(result))
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            print(f"[Analyzer] Could not cache {path}: {e}")
+    return result, False
+
+
+def _analysis_workers() -> int:
+    """Size of the shared analysis pool: one worker per core, capped."""
+    return min(os.cpu_count() or 1, MAX_ANALYSIS_WORKERS)
+
+
+def prune_cache(cache_dir: str, max_bytes: int) -> int:
+    """
+    Delete the least recently used entries in cache_dir until it holds at
+    most max_bytes. Hits refresh an entry's mtime, so mtime order is LRU
+    order. Temporary files are only removed once they are an hour old, so
+    writes in progress are left alone. Safe to run while analyses use the
+    directory: a missing entry is just a miss. Returns the number removed.
+    """
+    entries = []
+    total = 0
+    stale_before = time.time() - 3600
+    removed = 0
+    try:
+        with os.scandir(cache_dir) as it:
+            for entry in it:
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                if entry.name.endswith(".tmp"):
+                    if st.st_mtime < stale_before:
+                        removed += _remove_quietly(entry.path)
+                    continue
+                entries.append((st.st_mtime_ns, st.st_size, entry.path))
+                total += st.st_size
+    except OSError:
+        return removed
+
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        removed += _remove_quietly(path)
+        total -= size
+    return removed
+
+
+def _remove_quietly(path: str) -> int:
+    """Delete a file, returning 1 if it was removed (another process may have got there first)."""
+    try:
+        os.remove(path)
+        return 1
+    except OSError:
+        return 0
+
+
+def _pool_context() -> multiprocessing.context.BaseContext:
+    """
+    Start workers from a forkserver rather than by forking the caller. The
+    pool is first created from a request thread while the event loop and
+    discovery threads are running, and a fork can copy a lock one of them
+    holds (print, import) into a worker that then deadlocks. It would also
+    copy the server's memory and open fds into every worker. The forkserver
+    preloads this module, so each worker starts with the grammars loaded.
+    Falls back to spawn where forkserver is unavailable (Windows).
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def _get_analysis_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    The process pool shared by every analysis in this process, created on
+    first use so requests don't pay worker startup each time. None on
+    single-core machines, where analysis runs inline.
+    """
+    global _ANALYSIS_POOL
+    workers = _analysis_workers()
+    if workers < 2:
+        return None
+    with _ANALYSIS_POOL_LOCK:
+        if _ANALYSIS_POOL is None:
+            _ANALYSIS_POOL = ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context())
+        return _ANALYSIS_POOL
+
+
+def _discard_analysis_pool(executor: ProcessPoolExecutor) -> None:
+    """Drop a broken pool (e.g. a worker was killed) so the next analysis starts a new one."""
+    global _ANALYSIS_POOL
+    with _ANALYSIS_POOL_LOCK:
+        if _ANALYSIS_POOL is executor:
+            _ANALYSIS_POOL = None
+    executor.shutdown(wait=False)
+
+
+def iter_analyzed_files(repo_path: str, cache_dir: Optional[str] = None,
+                        stats: Optional[Dict[str, int]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the detailed analysis of each source file in the repository, in
+    discovery order, as soon as it is ready. If cache_dir is given, unchanged
+    files are served from JSON entries there. It must be a directory the
+    caller owns, never one inside the analyzed tree. Entries are keyed by
+    relative path and contents, so one cache_dir can be shared by several
+    copies of a repo. If stats is given, its "hits" and "misses" counts are
+    updated.
+    """
+    # Source files are analyzed while discovery is still walking the tree
+    file_paths = iter_source_files(repo_path)
+
+    if cache_dir:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+        except OSError as e:
+            print(f"[Analyzer] Cache disabled, cannot create {cache_dir}: {e}")
+            cache_dir = None
     
-    return source_files
+    # Analyze each file - files are independent, so spread parsing across cores
+    # Peek ahead so a single-file repo doesn't pay for inter-process round trips
+    first = list(islice(file_paths, 2))
+    executor = _get_analysis_pool() if len(first) > 1 else None
+    if executor is not None:
+        try:
+            results = _submit_in_order(executor, chain(first, file_paths), repo_path, cache_dir)
+            yield from _tally_cache_hits(results, stats)
+        except BrokenProcessPool:
+            _discard_analysis_pool(executor)
+            raise
+    else:
+        worker = partial(_analyze_one, base_path=repo_path, cache_dir=cache_dir)
+        yield from _tally_cache_hits(map(worker, chain(first, file_paths)), stats)
+
+
+def _analyze_batch(paths: List[str], base_path: str, cache_dir: Optional[str]) -> List[Tuple[Optional[Dict[str, Any]], bool]]:
+    """Process-pool worker: _analyze_one over several paths, to amortize IPC."""
+    return [_analyze_one(path, base_path, cache_dir) for path in paths]
+
+
+def _submit_in_order(executor: ProcessPoolExecutor, paths: Iterator[str], base_path: str,
+                     cache_dir: Optional[str]) -> Iterator[Tuple[Optional[Dict[str, Any]], bool]]:
+    """
+    Yield _analyze_one results in discovery order while discovery is still
+    running. Executor.map would drain the whole path iterator before
+    returning, so batches are submitted as paths arrive instead. At most
+    ANALYSIS_BATCHES_PER_WORKER batches per worker are in flight, and
+    finished batches at the head are yielded between submissions.
+    """
+    window: Deque[Future] = deque()
+    limit = _analysis_workers() * ANALYSIS_BATCHES_PER_WORKER
+    try:
+        while batch := list(islice(paths, ANALYSIS_BATCH_SIZE)):
+            window.append(executor.submit(_analyze_batch, batch, base_path, cache_dir))
+            while window and (len(window) >= limit or window[0].done()):
+                yield from window.popleft().result()
+        while window:
+            yield from window.popleft().result()
+    finally:
+        # Consumer stopped early or a batch failed: drop work not yet started
+        for future in window:
+            future.cancel()
+
+
+def _tally_cache_hits(results: Iterator[Tuple[Optional[Dict[str, Any]], bool]],
+                      stats: Optional[Dict[str, int]]) -> Iterator[Dict[str, Any]]:
+    """Yield the non-empty results from _analyze_one, counting cache hits into stats."""
+    for result, hit in results:
+        if stats is not None:
+            key = "hits" if hit else "misses"
+            stats[key] = stats.get(key, 0) + 1
+        if result:
+            yield result
+
+
+def build_call_edges(analyzed_files: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """
+    Build architecture edges (function calls between files). Only filePath and
+    each function's name, functionName and calls are read.
+    """
+    all_functions = {  # Map function name to file
+        func["name"]: file_data["filePath"]
+        for file_data in analyzed_files
+        for func in file_data["listOfFunctions"]
+    }
+    return [
+        {
+            "source": func["functionName"],
+            "target": f"{target_file}-{call}",
+            "sourceFile": file_data["filePath"],
+            "targetFile": target_file,
+        }
+        for file_data in analyzed_files
+        for func in file_data["listOfFunctions"]
+        for call in func["calls"]
+        if (target_file := all_functions.get(call)) is not None
+        and target_file != file_data["filePath"]
+    ]
+
+
+def edge_skeleton(file_data: Dict[str, Any]) -> Dict[str, Any]:
+    """The subset of a file's analysis that build_call_edges reads."""
+    return {
+        "filePath": file_data["filePath"],
+        "listOfFunctions": [
+            {"name": f["name"], "functionName": f["functionName"], "calls": f["calls"]}
+            for f in file_data["listOfFunctions"]
+        ],
+    }
 
 
-def analyze_repo_detailed(repo_path: str) -> Dict[str, Any]:
+def analyze_repo_detailed(repo_path: str, cache_dir: Optional[str] = None) -> Dict[str, Any]:
     """
     Analyze entire repository with detailed function information.
     Returns structured data suitable for frontend visualization.
+    Unchanged files are served from cache_dir, if one is given.
     """
-    # Find all source files
-    file_paths = find_source_files(repo_path)
-    
-    # Analyze each file
-    analyzed_files = []
-    for f in file_paths:
-        result = analyze_file_detailed(f, repo_path)
-        if result:
-            analyzed_files.append(result)
-    
-    # Build architecture edges (function calls between files)
-    edges = []
-    all_functions = {}  # Map function name to file
-    
-    for file_data in analyzed_files:
-        for func in file_data["listOfFunctions"]:
-            all_functions[func["name"]] = file_data["filePath"]
-    
-    for file_data in analyzed_files:
-        for func in file_data["listOfFunctions"]:
-            for call in func["calls"]:
-                if call in all_functions and all_functions[call] != file_data["filePath"]:
-                    edges.append({
-                        "source": func["functionName"],
-                        "target": f"{all_functions[call]}-{call}",
-                        "sourceFile": file_data["filePath"],
-                        "targetFile": all_functions[call],
-                    })
+    analyzed_files = list(iter_analyzed_files(repo_path, cache_dir))
 
     return {
         "listOfFiles": analyzed_files,
-        "edges": edges,
+        "edges": build_call_edges(analyzed_files),
         "totalFiles": len(analyzed_files),
         "totalFunctions": sum(f["totalFunctions"] for f in analyzed_files),
     }
 
 
 def analyze_repo(repo_path: str) -> Dict[str, Any]:
-    """Legacy function for backward compatibility"""
+    """
+    Legacy function for backward compatibility.
+    Files are analyzed in the shared process pool, like analyze_repo_detailed.
+    """
     results = {}
-    valid_exts = [".js", ".jsx", ".ts", ".tsx", ".py", ".java", ".cpp", ".cc", ".cxx", ".h", ".hpp", ".rs"]
 
-    file_paths = []
-    for root, _, files in os.walk(repo_path):
-        for f in files:
-            if os.path.splitext(f)[1] in valid_exts:
-                file_paths.append(os.path.join(root, f))
+    file_paths = find_source_files(repo_path)
+
+    executor = _get_analysis_pool() if len(file_paths) > 1 else None
+    if executor is not None:
+        # Large chunks amortize IPC; four per worker keeps the load balanced
+        chunksize = max(1, len(file_paths) // (4 * _analysis_workers()))
+        try:
+            metas = list(executor.map(analyze_file, file_paths, chunksize=chunksize))
+        except BrokenProcessPool:
+            _discard_analysis_pool(executor)
+            raise
+    else:
+        metas = [analyze_file(f) for f in file_paths]
 
-    for f in file_paths:
-        meta = analyze_file(f)
+    for f, meta in zip(file_paths, metas):
         if meta:
             results[f] = meta
 
+    # Resolve relative imports against the analyzed files, not the filesystem:
+    # index each file under its extensionless path, so one lookup finds every
+    # candidate (a.js, a.ts, ...) in EXTENSION_TO_LANG order
+    ext_order = {ext: i for i, ext in enumerate(EXTENSION_TO_LANG)}
+    by_stem: Dict[str, List[Tuple[int, str]]] = {}
+    for f in results:
+        normalized = os.path.normpath(f)
+        stem, ext = os.path.splitext(normalized)
+        if ext in ext_order:
+            by_stem.setdefault(stem, []).append((ext_order[ext], normalized))
+    for candidates in by_stem.values():
+        candidates.sort()
+
     edges = []
     for file, meta in results.items():
+        base_dir = os.path.dirname(file)
         for imp in meta["imports"]:
             if imp.startswith("."):
-                base_dir = os.path.dirname(file)
                 possible = os.path.normpath(os.path.join(base_dir, imp))
-                for ext in valid_exts:
-                    if os.path.exists(possible + ext):
-                        edges.append({"source": file, "target": possible + ext})
+                for _, target in by_stem.get(possible, ()):
+                    edges.append({"source": file, "target": target})
 
     nodes = [{"id": f} for f in results.keys()]
 
@@ -804,11 +1293,43 @@ def analyze_repo(repo_path: str) -> Dict[str, Any]:
     }
 
 
+# -------------------------------
+# Streaming output
+# -------------------------------
+def write_ndjson(repo_path: str, out, cache_dir: Optional[str] = None) -> None:
+    """
+    Stream the analysis to a binary file object as NDJSON: one line per file
+    as soon as it is analyzed, then a summary line with edges and totals.
+    Only the fields needed for edges are kept, not every function body.
+    """
+    skeletons = []
+    total_functions = 0
+    for file_data in iter_analyzed_files(repo_path, cache_dir):
+        out.write(orjson.dumps(file_data))
+        out.write(b"\n")
+        total_functions += file_data["totalFunctions"]
+        skeletons.append(edge_skeleton(file_data))
+
+    out.write(orjson.dumps({
+        "edges": build_call_edges(skeletons),
+        "totalFiles": len(skeletons),
+        "totalFunctions": total_functions,
+    }))
+    out.write(b"\n")
+
+
 # -------------------------------
 # Local testing
 # -------------------------------
 if __name__ == "__main__":
-    import sys
-    repo = sys.argv[1]
-    output = analyze_repo_detailed(repo)
-    print(json.dumps(output, indent=2))
+    # Usage: python -m core.analyzer <repo> [--ndjson] [--cache-dir=DIR]
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    repo = args[0]
+    cache_dir = next((a.split("=", 1)[1] for a in sys.argv[1:] if a.startswith("--cache-dir=")), None)
+    if "--ndjson" in sys.argv[1:]:
+        write_ndjson(repo, sys.stdout.buffer, cache_dir)
+    else:
+        output = analyze_repo_detailed(repo, cache_dir)
+        # Encode straight to bytes; skips the pure-Python indented encoder
+        sys.stdout.buffer.write(orjson.dumps(output, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        sys.stdout.buffer.write(b"\n")
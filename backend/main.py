@@ -1,10 +1,16 @@
+import os
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from routes.upload import router as upload_router
 from routes.analysis import router as analysis_router
 from routes.github import router as github_router
 
-app = FastAPI(title="Code Lantern API", version="1.0.0")
+# Architecture maps can run to megabytes: encode with orjson, compress on the wire
+app = FastAPI(title="Code Lantern API", version="1.0.0", default_response_class=ORJSONResponse)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 # Add CORS middleware for frontend integration
 app.add_middleware(
@@ -52,10 +58,6 @@ app.include_router(upload_router, prefix="/api")
 app.include_router(analysis_router, prefix="/api")
 app.include_router(github_router, prefix="/api")
 
-import os
-
-# ... imports ...
-
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
@@ -5,9 +5,17 @@ Uses tree-sitter based analyzer from core for accurate AST analysis.
 """
 
 import os
-import json
-from typing import List, Dict, Any
+import asyncio
+import tempfile
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from types import MappingProxyType
+from typing import List, Dict, Any, Optional, Tuple, Iterator, AsyncIterator, Hashable
+import orjson
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -17,16 +25,19 @@ router = APIRouter()
 # Import the enhanced tree-sitter analyzer
 from core.analyzer import (
     analyze_file_detailed,
-    analyze_repo_detailed,
+    iter_analyzed_files,
+    build_call_edges,
+    edge_skeleton,
+    CACHE_DIR_NAME,
+    prune_cache,
     find_source_files,
     get_function_code,
-    detect_language,
     SUPPORTED_EXTENSIONS,
     IGNORED_DIRECTORIES,
 )
 
 # Import LLM provider and rate limiter
-from services.llm_provider import generate_with_fallback, parse_json_from_response
+from services.llm_provider import generate_with_fallback, get_cached_response, parse_json_from_response
 from services.rate_limiter import rate_limiter
 
 
@@ -36,7 +47,8 @@ from services.rate_limiter import rate_limiter
 
 @router.get("/analyze/{repo_id}")
 async def analyze_project(repo_id: str):
-    """Analyze uploaded project and generate architecture map using tree-sitter AST."""
+    """Analyze uploaded project and generate architecture map using tree-sitter AST.
+    The response is streamed file by file as analysis proceeds."""
     
     # Find the repo directory
     repo_path = os.path.join("processed_repos", repo_id)
@@ -44,25 +56,21 @@ async def analyze_project(repo_id: str):
     if not os.path.exists(repo_path):
         raise HTTPException(status_code=404, detail="Repository not found")
     
-    # Use enhanced tree-sitter analyzer
-    architecture_map = analyze_repo_detailed(repo_path)
+    # Use enhanced tree-sitter analyzer. It is CPU-bound and reads every
+    # file, so results are pulled off the event loop one file at a time.
+    # The first is fetched up front so an empty repo can still 404.
+    cache_stats = {"hits": 0, "misses": 0}
+    analyzed_files = iter_analyzed_files(repo_path, cache_dir=ANALYSIS_CACHE_DIR, stats=cache_stats)
+    first = await asyncio.to_thread(next, analyzed_files, None)
     
-    if not architecture_map["listOfFiles"]:
+    if first is None:
         raise HTTPException(status_code=404, detail="No source files found")
     
-    # Save to JSON file
     json_path = os.path.join(repo_path, "architecture_map.json")
-    with open(json_path, 'w') as f:
-        json.dump(architecture_map, f, indent=2)
-    
-    return {
-        "status": "ok",
-        "repo_id": repo_id,
-        "files_analyzed": architecture_map["totalFiles"],
-        "functions_found": architecture_map["totalFunctions"],
-        "json_path": json_path,
-        "architecture_map": {"listOfFiles": architecture_map["listOfFiles"]}
-    }
+    return StreamingResponse(
+        _stream_analysis(repo_id, json_path, first, analyzed_files, cache_stats),
+        media_type="application/json",
+    )
 
 
 @router.get("/files/{repo_id}")
@@ -78,38 +86,51 @@ async def get_project_files(repo_id: str):
     if not os.path.exists(json_path):
         raise HTTPException(status_code=404, detail="Architecture map not found. Run analysis first.")
     
-    with open(json_path, 'r') as f:
-        architecture_map = json.load(f)
-    
-    # Transform for file browser view
-    files_with_functions = []
-    for file_data in architecture_map.get('listOfFiles', []):
-        functions = file_data.get('listOfFunctions', [])
-        file_info = {
-            "filePath": file_data['filePath'],
-            "language": file_data.get('language', 'unknown'),
-            "functionCount": len(functions),
-            "functions": [func.get('name', func['functionName'].split('-')[-1]) for func in functions]
-        }
-        files_with_functions.append(file_info)
+    files_with_functions = await asyncio.to_thread(load_files_index, json_path)
     
-    return {
+    return ORJSONResponse({
         "status": "ok",
         "repo_id": repo_id,
         "totalFiles": len(files_with_functions),
         "files": files_with_functions
-    }
+    })
 
 
 @router.get("/function/{repo_id}")
-async def get_function_details(repo_id: str, file_path: str, function_name: str, request: Request):
+async def get_function_details(repo_id: str, file_path: str, function_name: str, request: Request, no_cache: bool = False):
     """Get detailed description of a specific function with rate limiting"""
     
     # Get client IP for rate limiting
     client_ip = request.client.host if request.client else "unknown"
     
-    # Check cache first (doesn't count against rate limit)
-    cached = rate_limiter.get_cached_function(repo_id, file_path, function_name)
+    repo_path = os.path.join("processed_repos", repo_id)
+    
+    print(f"[DEBUG] get_function_details called:")
+    print(f"  repo_id: {repo_id}")
+    print(f"  file_path: {file_path}")
+    print(f"  function_name: {function_name}")
+    print(f"  client_ip: {client_ip}")
+    
+    if not os.path.exists(repo_path):
+        raise HTTPException(status_code=404, detail=f"Repository not found: {repo_id}")
+    
+    # May parse the architecture map on a cache miss, so keep it off the event loop
+    full_file_path, paths_tried = await asyncio.to_thread(_resolve_function_file, repo_path, file_path)
+    
+    if not full_file_path:
+        raise HTTPException(
+            status_code=404, 
+            detail=f"File not found: {file_path}. Tried: {paths_tried[:3]}"
+        )
+    
+    # Use tree-sitter based function code extraction
+    function_code = await asyncio.to_thread(get_function_code, full_file_path, function_name)
+    
+    if not function_code:
+        raise HTTPException(status_code=404, detail="Function not found in file")
+    
+    # Check cache first (doesn't count against rate limit); no_cache forces a fresh description
+    cached = None if no_cache else await get_cached_function_description(function_code, function_name, file_path)
     if cached:
         print(f"[Rate Limiter] Cache hit for {function_name}")
         return {
@@ -132,72 +153,17 @@ async def get_function_details(repo_id: str, file_path: str, function_name: str,
                 "tip": "Upload a new project to reset your limit, or try again later."
             }
         )
-    
-    repo_path = os.path.join("processed_repos", repo_id)
-    
-    print(f"[DEBUG] get_function_details called:")
-    print(f"  repo_id: {repo_id}")
-    print(f"  file_path: {file_path}")
-    print(f"  function_name: {function_name}")
-    print(f"  client_ip: {client_ip}")
     print(f"  usage: {current + 1}/{max_allowed}")
     
-    if not os.path.exists(repo_path):
-        raise HTTPException(status_code=404, detail=f"Repository not found: {repo_id}")
-    
-    # Try multiple path variations to find the file
-    full_file_path = None
-    paths_tried = []
-    
-    # Variation 1: Direct path
-    direct_path = os.path.join(repo_path, file_path)
-    paths_tried.append(direct_path)
-    if os.path.exists(direct_path):
-        full_file_path = direct_path
-    
-    # Variation 2: Try without leading directory (common with cloned repos)
-    if not full_file_path and '/' in file_path:
-        parts = file_path.split('/')
-        for i in range(len(parts)):
-            partial_path = '/'.join(parts[i:])
-            test_path = os.path.join(repo_path, partial_path)
-            paths_tried.append(test_path)
-            if os.path.exists(test_path):
-                full_file_path = test_path
-                break
-    
-    # Variation 3: Search recursively for the filename
-    if not full_file_path:
-        filename = os.path.basename(file_path)
-        for root, dirs, files in os.walk(repo_path):
-            if filename in files:
-                full_file_path = os.path.join(root, filename)
-                break
-    
-    if not full_file_path:
-        raise HTTPException(
-            status_code=404, 
-            detail=f"File not found: {file_path}. Tried: {paths_tried[:3]}"
-        )
-    
-    # Use tree-sitter based function code extraction
-    function_code = get_function_code(full_file_path, function_name)
-    
-    if not function_code:
-        raise HTTPException(status_code=404, detail="Function not found in file")
-    
     # Determine file type for display
-    lang = detect_language(full_file_path)
     file_type = SUPPORTED_EXTENSIONS.get(os.path.splitext(file_path)[1].lower(), 'unknown')
     
     # Record usage BEFORE making AI call
     rate_limiter.record_function_detail(client_ip, repo_id)
     
-    # Generate description using AI
-    function_description = await generate_function_description(function_code, function_name, file_path)
-    
-    # Cache the result
-    rate_limiter.cache_function(repo_id, file_path, function_name, function_description)
+    # Generate description using AI. The cache was checked above; a usable
+    # reply is still stored for next time.
+    function_description = await generate_function_description(function_code, function_name, file_path, use_cache=False)
     
     # Get updated usage
     used, max_limit = rate_limiter.get_function_detail_usage(client_ip, repo_id)
@@ -217,16 +183,97 @@ async def get_function_details(repo_id: str, file_path: str, function_name: str,
 
 
 @router.get("/function")
-async def get_function_details_latest(file_path: str, function_name: str, request: Request):
+async def get_function_details_latest(file_path: str, function_name: str, request: Request, no_cache: bool = False):
     """Get function details for the latest uploaded repo"""
     repo_id = get_latest_repo_id()
     if not repo_id:
         raise HTTPException(status_code=404, detail="No repo uploaded yet")
-    return await get_function_details(repo_id, file_path, function_name, request)
+    return await get_function_details(repo_id, file_path, function_name, request, no_cache)
+
+
+class FunctionRef(BaseModel):
+    file_path: str
+    function_name: str
+
+
+class FunctionBatchRequest(BaseModel):
+    functions: List[FunctionRef]
+
+
+# Upper bound on functions accepted by a single batch request
+MAX_BATCH_FUNCTIONS = 20
+
+
+@router.post("/functions/batch/{repo_id}")
+async def get_function_details_batch(repo_id: str, batch: FunctionBatchRequest, request: Request, no_cache: bool = False):
+    """Describe several functions at once, dispatching the uncached ones to the LLM concurrently"""
+    if len(batch.functions) > MAX_BATCH_FUNCTIONS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_FUNCTIONS} functions per batch")
+    
+    repo_path = os.path.join("processed_repos", repo_id)
+    if not os.path.exists(repo_path):
+        raise HTTPException(status_code=404, detail=f"Repository not found: {repo_id}")
+    
+    client_ip = request.client.host if request.client else "unknown"
+    results: List[Dict[str, Any]] = []
+    pending = []  # (result entry, function code)
+    
+    for ref in batch.functions:
+        entry = {"file_path": ref.file_path, "function_name": ref.function_name}
+        results.append(entry)
+        
+        full_file_path, _ = await asyncio.to_thread(_resolve_function_file, repo_path, ref.file_path)
+        if not full_file_path:
+            entry["error"] = "File not found"
+            continue
+        
+        function_code = await asyncio.to_thread(get_function_code, full_file_path, ref.function_name)
+        if not function_code:
+            entry["error"] = "Function not found in file"
+            continue
+        
+        # Cached descriptions don't count against the rate limit
+        cached = None if no_cache else await get_cached_function_description(function_code, ref.function_name, ref.file_path)
+        if cached:
+            entry.update(details=cached, cached=True)
+            continue
+        
+        allowed, _, _ = rate_limiter.check_function_detail_limit(client_ip, repo_id)
+        if not allowed:
+            entry["error"] = "Rate limit reached"
+            continue
+        
+        # Record usage BEFORE making AI calls
+        rate_limiter.record_function_detail(client_ip, repo_id)
+        pending.append((entry, function_code))
+    
+    print(f"[Batch] {len(batch.functions)} requested, {len(pending)} sent to AI")
+    
+    # Cache lookups were done above
+    descriptions = await describe_many(
+        [(code, entry["function_name"], entry["file_path"]) for entry, code in pending],
+        use_cache=False,
+    )
+    
+    for (entry, _), description in zip(pending, descriptions):
+        entry.update(details=description, cached=False)
+    
+    used, max_limit = rate_limiter.get_function_detail_usage(client_ip, repo_id)
+    
+    return {
+        "status": "ok",
+        "repo_id": repo_id,
+        "results": results,
+        "rate_limit": {
+            "used": used,
+            "max": max_limit,
+            "remaining": max_limit - used
+        }
+    }
 
 
 @router.get("/project-summary/{repo_id}")
-async def get_project_summary(repo_id: str):
+async def get_project_summary(repo_id: str, no_cache: bool = False):
     """Generate comprehensive AI-powered project summary and analytics"""
     repo_path = os.path.join("processed_repos", repo_id)
     
@@ -239,10 +286,9 @@ async def get_project_summary(repo_id: str):
     metadata_path = os.path.join(repo_path, "project_metadata.json")
     if os.path.exists(metadata_path):
         try:
-            with open(metadata_path, 'r') as f:
-                metadata = json.load(f)
-                project_name = metadata.get("project_name", repo_id)
-                project_source = metadata.get("source", "unknown")
+            metadata = await asyncio.to_thread(_read_json, metadata_path)
+            project_name = metadata.get("project_name", repo_id)
+            project_source = metadata.get("source", "unknown")
         except Exception:
             pass
     
@@ -251,16 +297,27 @@ async def get_project_summary(repo_id: str):
     if not os.path.exists(json_path):
         raise HTTPException(status_code=404, detail="Architecture map not found. Run analysis first.")
     
-    with open(json_path, 'r') as f:
-        architecture_map = json.load(f)
+    # Reuse stats and AI summary when this exact map was summarized before
+    summary_key = _summary_cache_key(json_path)
+    architecture_map = await asyncio.to_thread(load_architecture_map, json_path)
     
-    # Analyze project statistics - now using tree-sitter derived data
-    project_stats = analyze_project_statistics(architecture_map, repo_path)
-    
-    # Generate AI summary
-    ai_summary = await generate_project_ai_summary(project_stats, architecture_map)
+    cached = None if no_cache else _lru_get(_SUMMARY_CACHE, summary_key)
+    if cached:
+        print(f"[Summary Cache] Hit for {repo_id}")
+        project_stats, ai_summary = cached
+    else:
+        # Analyze project statistics - now using tree-sitter derived data.
+        # Pure CPU work, so keep it off the event loop.
+        project_stats = await asyncio.to_thread(analyze_project_statistics, architecture_map, repo_path)
+        
+        # Generate AI summary
+        ai_summary = await generate_project_ai_summary(project_stats, architecture_map, use_cache=not no_cache)
+        
+        # Only cache real AI output so a provider outage isn't remembered
+        if ai_summary.get("source") != "static":
+            _lru_put(_SUMMARY_CACHE, summary_key, (project_stats, ai_summary), SUMMARY_CACHE_SIZE)
     
-    return {
+    return ORJSONResponse({
         "status": "ok",
         "repo_id": repo_id,
         "project_name": project_name,
@@ -268,17 +325,21 @@ async def get_project_summary(repo_id: str):
         "project_stats": project_stats,
         "ai_summary": ai_summary,
         "generated_at": get_current_timestamp()
-    }
+    })
 
 
 # -------------------------------
 # AI-Powered Analysis Functions
 # -------------------------------
 
-async def generate_function_description(function_code: str, function_name: str, file_path: str) -> Dict[str, str]:
-    """Generate function description using multi-LLM provider with automatic fallback"""
-    
-    prompt = f"""Analyze this function and provide a structured description:
+# Token budget for a function description. Part of the response cache key,
+# so lookups and generation must use the same value.
+DESCRIPTION_MAX_TOKENS = 500
+
+
+def _function_prompt(function_code: str, function_name: str, file_path: str) -> str:
+    """Prompt asking for a structured description of one function"""
+    return f"""Analyze this function and provide a structured description:
 
 File: {file_path}
 Function Code:
@@ -300,8 +361,36 @@ Format your response as JSON:
     "description": "clear description of what the function does"
 }}"""
 
+
+def _parse_function_description(result: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    """Parsed description from an LLM result, tagged with the provider that wrote it"""
+    parsed = parse_json_from_response(result["text"])
+    if parsed:
+        parsed["_provider"] = result["provider"]  # Include which provider was used
+    return parsed
+
+
+async def get_cached_function_description(function_code: str, function_name: str,
+                                          file_path: str) -> Optional[Dict[str, str]]:
+    """
+    A previously generated description of this function, or None. Served
+    from the LLM response cache, which is keyed by the full prompt (file
+    path, name and code), without calling any provider.
+    """
+    prompt = _function_prompt(function_code, function_name, file_path)
+    result = await get_cached_response(prompt, max_tokens=DESCRIPTION_MAX_TOKENS)
+    return _parse_function_description(result) if result else None
+
+
+async def generate_function_description(function_code: str, function_name: str, file_path: str,
+                                        use_cache: bool = True) -> Dict[str, str]:
+    """Generate function description using multi-LLM provider with automatic fallback"""
+    
+    prompt = _function_prompt(function_code, function_name, file_path)
+
     # Use the multi-LLM provider with automatic fallback
-    result = await generate_with_fallback(prompt, max_tokens=500)
+    result = await generate_with_fallback(prompt, max_tokens=DESCRIPTION_MAX_TOKENS, use_cache=use_cache,
+                                          validate=parse_json_from_response)
     
     if result["error"]:
         print(f"[AI] All providers failed: {result['error']}")
@@ -313,9 +402,8 @@ Format your response as JSON:
         }
     
     # Parse JSON from response
-    parsed = parse_json_from_response(result["text"])
+    parsed = _parse_function_description(result)
     if parsed:
-        parsed["_provider"] = result["provider"]  # Include which provider was used
         return parsed
     
     # Fallback if JSON parsing fails
@@ -327,26 +415,53 @@ Format your response as JSON:
     }
 
 
+# Max LLM requests in flight for one batch, to stay under provider limits
+AI_CONCURRENCY = 8
+
+
+async def describe_many(funcs: List[Tuple[str, str, str]], use_cache: bool = True) -> List[Dict[str, str]]:
+    """Describe (function_code, function_name, file_path) tuples concurrently, in order"""
+    sem = asyncio.Semaphore(AI_CONCURRENCY)
+    
+    async def one(function_code: str, function_name: str, file_path: str) -> Dict[str, str]:
+        async with sem:
+            return await generate_function_description(function_code, function_name, file_path, use_cache)
+    
+    return await asyncio.gather(*(one(*f) for f in funcs))
+
+
 # -------------------------------
 # Project Statistics (Enhanced)
 # -------------------------------
 
+# Map file extensions to display language names
+_LANG_MAPPING = MappingProxyType({
+    '.py': 'Python',
+    '.js': 'JavaScript', '.jsx': 'JavaScript',
+    '.ts': 'TypeScript', '.tsx': 'TypeScript',
+    '.java': 'Java',
+    '.cpp': 'C++', '.cc': 'C++', '.cxx': 'C++', '.h': 'C++', '.hpp': 'C++',
+    '.c': 'C',
+    '.go': 'Go',
+    '.rs': 'Rust'
+})
+
+
 def analyze_project_statistics(architecture_map: dict, repo_path: str) -> dict:
     """Analyze comprehensive project statistics using tree-sitter derived data"""
     list_of_files = architecture_map.get('listOfFiles', [])
     
     # File analysis
     total_files = len(list_of_files)
-    file_extensions = {}
+    file_extensions = Counter()
     total_lines = 0
     
     # Function analysis - now uses accurate tree-sitter complexity
     total_functions = 0
     total_calls = 0
-    complexity_values = []
     
     # Language detection
-    language_stats = {}
+    language_stats = Counter()
     
     for file_data in list_of_files:
         file_path = file_data.get('filePath', '')
@@ -358,31 +473,23 @@ def analyze_project_statistics(architecture_map: dict, repo_path: str) -> dict:
         # Get file extension
         ext = os.path.splitext(file_path)[1]
         if ext:
-            file_extensions[ext] = file_extensions.get(ext, 0) + 1
+            file_extensions[ext] += 1
             
             # Map extensions to languages
-            lang_mapping = {
-                '.py': 'Python',
-                '.js': 'JavaScript', '.jsx': 'JavaScript',
-                '.ts': 'TypeScript', '.tsx': 'TypeScript',
-                '.java': 'Java',
-                '.cpp': 'C++', '.cc': 'C++', '.cxx': 'C++', '.h': 'C++', '.hpp': 'C++',
-                '.c': 'C',
-                '.go': 'Go',
-                '.rs': 'Rust'
-            }
-            lang_name = lang_mapping.get(ext)
+            lang_name = _LANG_MAPPING.get(ext)
             if lang_name:
-                language_stats[lang_name] = language_stats.get(lang_name, 0) + 1
+                language_stats[lang_name] += 1
         
         # Function statistics - use tree-sitter complexity
         total_functions += len(functions)
-        for func in functions:
-            calls = func.get('calls', [])
-            total_calls += len(calls)
-            # Use the accurate tree-sitter calculated complexity
-            complexity = func.get('complexity', 1)
-            complexity_values.append(complexity)
+        total_calls += sum(len(func.get('calls', [])) for func in functions)
+    
+    # Use the accurate tree-sitter calculated complexity
+    complexity_values = [
+        func.get('complexity', 1)
+        for file_data in list_of_files
+        for func in file_data.get('listOfFunctions', [])
+    ]
     
     # Calculate percentages
     total_language_files = sum(language_stats.values())
@@ -401,7 +508,7 @@ def analyze_project_statistics(architecture_map: dict, repo_path: str) -> dict:
     return {
         "file_stats": {
             "total_files": total_files,
-            "file_extensions": file_extensions,
+            "file_extensions": dict(file_extensions),
             "estimated_lines_of_code": total_lines
         },
         "function_stats": {
@@ -412,9 +519,9 @@ def analyze_project_statistics(architecture_map: dict, repo_path: str) -> dict:
             "functions_per_file": round(total_functions / total_files, 2) if total_files > 0 else 0
         },
         "language_stats": {
-            "languages": language_stats,
+            "languages": dict(language_stats),
             "language_percentages": language_percentages,
-            "primary_language": max(language_stats, key=language_stats.get) if language_stats else "Unknown"
+            "primary_language": language_stats.most_common(1)[0][0] if language_stats else "Unknown"
         },
         "complexity_metrics": {
             "code_health_score": code_health,
@@ -424,6 +531,19 @@ def analyze_project_statistics(architecture_map: dict, repo_path: str) -> dict:
     }
 
 
+# Score thresholds. Each tuple is sorted and inclusive, so
+# bisect_left(thresholds, value) gives the matching label/penalty index.
+_COMPLEXITY_PENALTY_THRESHOLDS = (3, 5, 7, 10, 15)
+_COMPLEXITY_PENALTIES = (0, 5, 10, 20, 30, 40)
+
+_SIZE_FILE_LIMITS = (5, 15, 30)
+_SIZE_FUNCTION_LIMITS = (20, 60, 150)
+_SIZE_LABELS = ("Small", "Medium", "Large", "Enterprise")
+
+_COMPLEXITY_THRESHOLDS = (3, 6, 10)
+_COMPLEXITY_LABELS = ("Simple", "Moderate", "Complex", "Highly Complex")
+
+
 def calculate_code_health_score(total_files: int, total_functions: int, avg_complexity: float, language_stats: dict) -> int:
     """Calculate code health score out of 100 - strict and honest evaluation"""
     score = 100
@@ -437,16 +557,7 @@ def calculate_code_health_score(total_files: int, total_functions: int, avg_comp
         score -= 10
     
     # Strict complexity penalties (using accurate AST-based complexity)
-    if avg_complexity > 15:
-        score -= 40  # Very high complexity - major refactoring needed
-    elif avg_complexity > 10:
-        score -= 30  # High complexity
-    elif avg_complexity > 7:
-        score -= 20  # Moderate-high complexity
-    elif avg_complexity > 5:
-        score -= 10  # Slightly high complexity
-    elif avg_complexity > 3:
-        score -= 5   # Room for improvement
+    score -= _COMPLEXITY_PENALTIES[bisect_left(_COMPLEXITY_PENALTY_THRESHOLDS, avg_complexity)]
     
     # Penalize poor function distribution
     if total_files > 0:
@@ -469,29 +580,18 @@ def calculate_code_health_score(total_files: int, total_functions: int, avg_comp
 
 def categorize_project_size(total_files: int, total_functions: int) -> str:
     """Categorize project size"""
-    if total_files <= 5 and total_functions <= 20:
-        return "Small"
-    elif total_files <= 15 and total_functions <= 60:
-        return "Medium"
-    elif total_files <= 30 and total_functions <= 150:
-        return "Large"
-    else:
-        return "Enterprise"
+    # Smallest tier whose file AND function limits both hold
+    tier = max(bisect_left(_SIZE_FILE_LIMITS, total_files),
+               bisect_left(_SIZE_FUNCTION_LIMITS, total_functions))
+    return _SIZE_LABELS[tier]
 
 
 def categorize_architecture_complexity(avg_complexity: float) -> str:
     """Categorize architecture complexity"""
-    if avg_complexity <= 3:
-        return "Simple"
-    elif avg_complexity <= 6:
-        return "Moderate"
-    elif avg_complexity <= 10:
-        return "Complex"
-    else:
-        return "Highly Complex"
+    return _COMPLEXITY_LABELS[bisect_left(_COMPLEXITY_THRESHOLDS, avg_complexity)]
 
 
-async def generate_project_ai_summary(project_stats: dict, architecture_map: dict) -> dict:
+async def generate_project_ai_summary(project_stats: dict, architecture_map: dict, use_cache: bool = True) -> dict:
     """Generate an AI-powered summary using multi-LLM provider with automatic fallback."""
     
     fs = project_stats.get('file_stats', {})
@@ -521,7 +621,8 @@ Provide a comprehensive analysis in this exact JSON format:
 }}"""
 
     # Use the multi-LLM provider with automatic fallback
-    result = await generate_with_fallback(prompt, max_tokens=800)
+    result = await generate_with_fallback(prompt, max_tokens=800, use_cache=use_cache,
+                                          validate=parse_json_from_response)
     
     if result["error"]:
         print(f"[AI] All providers failed: {result['error']}")
@@ -564,6 +665,217 @@ def get_current_timestamp():
 BASE_REPO_DIR = os.path.join(os.getcwd(), "processed_repos")
 
 
+def _read_json(path: str) -> Any:
+    """Read and parse a JSON file with orjson."""
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read())
+
+
+# Per-file analysis cache shared by all uploads. Entries are keyed by
+# relative path and contents, so re-uploading a project reuses them. The
+# project cleanups skip it; it is pruned to ANALYSIS_CACHE_MAX_MB (least
+# recently used first) after each analysis.
+ANALYSIS_CACHE_DIR = os.path.join("processed_repos", CACHE_DIR_NAME)
+ANALYSIS_CACHE_MAX_BYTES = int(os.getenv("ANALYSIS_CACHE_MAX_MB", "256")) * 1024 * 1024
+
+# Set ARCH_MAP_PRETTY=1 to indent architecture_map.json for debugging. It is
+# written compact otherwise: the file is only read back programmatically.
+ARCH_MAP_PRETTY = os.getenv("ARCH_MAP_PRETTY", "").lower() in ("1", "true", "yes")
+
+
+def _resolve_function_file(repo_path: str, file_path: str) -> Tuple[Optional[str], List[str]]:
+    """Find a file inside the repo, tolerating extra leading directories. Returns (path, paths_tried).
+    Blocking - run it off the event loop."""
+    full_file_path = None
+    paths_tried = []
+    
+    # Variation 1: Direct path
+    direct_path = os.path.join(repo_path, file_path)
+    paths_tried.append(direct_path)
+    if os.path.exists(direct_path):
+        full_file_path = direct_path
+    
+    # Variation 2: Try without leading directory (common with cloned repos)
+    if not full_file_path and '/' in file_path:
+        parts = file_path.split('/')
+        for i in range(len(parts)):
+            partial_path = '/'.join(parts[i:])
+            test_path = os.path.join(repo_path, partial_path)
+            paths_tried.append(test_path)
+            if os.path.exists(test_path):
+                full_file_path = test_path
+                break
+    
+    # Variation 3: Look the filename up among the analyzed files
+    if not full_file_path:
+        json_path = os.path.join(repo_path, "architecture_map.json")
+        if os.path.exists(json_path):
+            filename = os.path.basename(file_path)
+            for indexed_path in load_path_index(json_path).get(filename, ()):
+                test_path = os.path.join(repo_path, indexed_path)
+                if os.path.exists(test_path):
+                    full_file_path = test_path
+                    break
+    
+    return full_file_path, paths_tried
+
+
+async def _stream_analysis(repo_id: str, json_path: str, first: dict, analyzed_files: Iterator[dict],
+                           cache_stats: Dict[str, int]) -> AsyncIterator[bytes]:
+    """
+    Yield the /analyze response body one file at a time, writing the same
+    files to architecture_map.json as they go. Only the fields needed for
+    edges are kept in memory. The map is moved into place before the body
+    ends, so a client that has read the response can load it. cache_stats
+    is filled in by the analyzer and reported at the end.
+
+    The streamed architecture_map is the saved one, edges and totals
+    included. "status" comes last: the 200 has already been sent when a
+    failure happens mid-stream, so the body is closed with "status":
+    "error" and a "detail" instead, and the previous map (if any) is left
+    in place.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(json_path), suffix=".tmp")
+    skeletons = []
+    total_functions = 0
+    try:
+        head = orjson.dumps({"repo_id": repo_id, "json_path": json_path})
+        yield head[:-1] + b',"architecture_map":{"listOfFiles":['
+        
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                out.write(b'{"listOfFiles":[')
+                file_data = first
+                separator = b""
+                while file_data is not None:
+                    chunk = separator + orjson.dumps(file_data)
+                    # The response is always compact; only the saved copy is indented
+                    out.write((separator + orjson.dumps(file_data, option=orjson.OPT_INDENT_2))
+                              if ARCH_MAP_PRETTY else chunk)
+                    separator = b","
+                    yield chunk
+                    total_functions += file_data["totalFunctions"]
+                    skeletons.append(edge_skeleton(file_data))
+                    file_data = await asyncio.to_thread(next, analyzed_files, None)
+                
+                # Same layout as analyze_repo_detailed's result
+                totals_map = {
+                    "edges": build_call_edges(skeletons),
+                    "totalFiles": len(skeletons),
+                    "totalFunctions": total_functions,
+                }
+                map_tail = b"]," + orjson.dumps(totals_map)[1:]
+                out.write((b"]," + orjson.dumps(totals_map, option=orjson.OPT_INDENT_2)[1:])
+                          if ARCH_MAP_PRETTY else map_tail)
+            # The map only ever appears complete, so readers never see a partial file
+            os.replace(tmp_path, json_path)
+        except Exception as e:
+            print(f"[Analyzer] {repo_id}: analysis failed after {len(skeletons)} files: {e!r}")
+            error = orjson.dumps({
+                "status": "error",
+                "detail": f"Analysis failed, architecture map not saved: {e}",
+            })
+            yield b"]}," + error[1:]
+            return
+        
+        print(f"[Analyzer] {repo_id}: {cache_stats['hits']} cached, {cache_stats['misses']} analyzed")
+        if cache_stats["misses"]:
+            await asyncio.to_thread(prune_cache, ANALYSIS_CACHE_DIR, ANALYSIS_CACHE_MAX_BYTES)
+        totals = orjson.dumps({
+            "files_analyzed": len(skeletons),
+            "functions_found": total_functions,
+            "cache": cache_stats,
+            "status": "ok",
+        })
+        # The map's edges and totals are only sent once it is saved, so a
+        # failure above still finds the client inside listOfFiles
+        yield map_tail + b"," + totals[1:]
+    finally:
+        # Left behind if analysis failed or the client disconnected mid-stream
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# Project summaries keyed by the architecture map's path and stat signature (LRU)
+SUMMARY_CACHE_SIZE = 64
+_SUMMARY_CACHE: "OrderedDict[Tuple[str, int, int], Tuple[dict, dict]]" = OrderedDict()
+
+
+def _summary_cache_key(json_path: str) -> Tuple[str, int, int]:
+    """Identify an architecture map like load_architecture_map does, without reading it."""
+    st = os.stat(json_path)
+    return (json_path, st.st_mtime_ns, st.st_size)
+
+
+def _lru_get(cache: OrderedDict, key: Hashable) -> Any:
+    """Look up key in an OrderedDict LRU, marking it most recently used."""
+    value = cache.get(key)
+    if value is not None:
+        cache.move_to_end(key)
+    return value
+
+
+def _lru_put(cache: OrderedDict, key: Hashable, value: Any, maxsize: int) -> None:
+    """Store value in an OrderedDict LRU, evicting the oldest entry when full."""
+    cache[key] = value
+    cache.move_to_end(key)
+    if len(cache) > maxsize:
+        cache.popitem(last=False)
+
+
+@lru_cache(maxsize=16)
+def _load_arch_map(json_path: str, mtime_ns: int, size: int) -> dict:
+    """Parse an architecture map. mtime/size are part of the cache key only."""
+    return _read_json(json_path)
+
+
+def load_architecture_map(json_path: str) -> dict:
+    """
+    Load architecture_map.json, parsing it only when the file has changed.
+    The returned dict is shared between requests - treat it as read-only.
+    """
+    st = os.stat(json_path)
+    return _load_arch_map(json_path, st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=16)
+def _build_path_index(json_path: str, mtime_ns: int, size: int) -> Dict[str, List[str]]:
+    """Map each analyzed file's basename to its repo-relative paths."""
+    index: Dict[str, List[str]] = {}
+    for file_data in _load_arch_map(json_path, mtime_ns, size).get('listOfFiles', []):
+        rel_path = file_data['filePath']
+        index.setdefault(os.path.basename(rel_path), []).append(rel_path)
+    return index
+
+
+def load_path_index(json_path: str) -> Dict[str, List[str]]:
+    """Basename index of an architecture map, rebuilt only when the map changes."""
+    st = os.stat(json_path)
+    return _build_path_index(json_path, st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=16)
+def _build_files_index(json_path: str, mtime_ns: int, size: int) -> List[Dict[str, Any]]:
+    """File browser view of an architecture map: each file with its function names."""
+    files_with_functions = []
+    for file_data in _load_arch_map(json_path, mtime_ns, size).get('listOfFiles', []):
+        functions = file_data.get('listOfFunctions', [])
+        file_info = {
+            "filePath": file_data['filePath'],
+            "language": file_data.get('language', 'unknown'),
+            "functionCount": len(functions),
+            "functions": [func.get('name', func['functionName'].split('-')[-1]) for func in functions]
+        }
+        files_with_functions.append(file_info)
+    return files_with_functions
+
+
+def load_files_index(json_path: str) -> List[Dict[str, Any]]:
+    """File browser view of an architecture map, rebuilt only when the map changes."""
+    st = os.stat(json_path)
+    return _build_files_index(json_path, st.st_mtime_ns, st.st_size)
+
+
 def get_latest_repo_id() -> str | None:
     try:
         latest_ptr = os.path.join(BASE_REPO_DIR, 'LATEST')
@@ -584,8 +896,8 @@ async def analyze_latest():
 
 
 @router.get("/project-summary")
-async def project_summary_latest():
+async def project_summary_latest(no_cache: bool = False):
     repo_id = get_latest_repo_id()
     if not repo_id:
         raise HTTPException(status_code=404, detail="No repo uploaded yet")
-    return await get_project_summary(repo_id)
\ No newline at end of file
+    return await get_project_summary(repo_id, no_cache)
\ No newline at end of file
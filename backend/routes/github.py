@@ -38,7 +38,8 @@ def cleanup_previous_projects():
     """Remove all previous projects to keep only current one"""
     if os.path.exists(BASE_REPO_DIR):
         for item in os.listdir(BASE_REPO_DIR):
-            if item == 'LATEST':
+            # Keep the pointer and the shared caches (dot-prefixed)
+            if item == 'LATEST' or item.startswith('.'):
                 continue
             item_path = os.path.join(BASE_REPO_DIR, item)
             if os.path.isfile(item_path):
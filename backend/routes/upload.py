@@ -21,8 +21,9 @@ def cleanup_old_projects(max_age_seconds: int = 3600):
     for item in os.listdir(BASE_REPO_DIR):
         item_path = os.path.join(BASE_REPO_DIR, item)
         
-        # Skip LATEST pointer
-        if item == 'LATEST':
+        # Skip LATEST pointer and the shared caches (dot-prefixed), which
+        # other workers may have open and which manage their own size
+        if item == 'LATEST' or item.startswith('.'):
             continue
             
         try:
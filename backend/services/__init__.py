@@ -3,11 +3,12 @@
 Code Lantern Services
 """
 
-from .llm_provider import generate_with_fallback, parse_json_from_response, get_available_providers
+from .llm_provider import generate_with_fallback, get_cached_response, parse_json_from_response, get_available_providers
 from .rate_limiter import rate_limiter
 
 __all__ = [
     "generate_with_fallback",
+    "get_cached_response",
     "parse_json_from_response", 
     "get_available_providers",
     "rate_limiter",
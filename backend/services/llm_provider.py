@@ -5,9 +5,16 @@ Supports: Groq → Gemini → Cohere with automatic failover
 """
 
 import os
-import json
+import time
+import random
+import sqlite3
+import hashlib
+import asyncio
+import weakref
+import threading
+import orjson
 import httpx
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple, Callable
 from enum import Enum
 from dotenv import load_dotenv
 
@@ -51,6 +58,21 @@ PROVIDER_CONFIGS = {
 # Priority order for fallback
 PROVIDER_PRIORITY = [LLMProvider.GROQ, LLMProvider.GEMINI, LLMProvider.COHERE]
 
+# Max in-flight requests per provider across the whole process, kept under
+# the free tiers' requests-per-minute limits
+PROVIDER_CONCURRENCY = 15
+
+# Semaphores are tied to the event loop that first waits on them, so each
+# loop gets its own set, created on first use (see _provider_semaphore)
+_provider_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[LLMProvider, asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+# Retries on a 429 before falling back to the next provider; the wait
+# doubles each time starting from RATE_LIMIT_BACKOFF seconds
+RATE_LIMIT_RETRIES = 2
+RATE_LIMIT_BACKOFF = 1.0
+
 # Track which providers are currently available (not rate-limited)
 _provider_status: Dict[LLMProvider, bool] = {p: True for p in LLMProvider}
 
@@ -176,11 +198,124 @@ PROVIDER_CALLS = {
 }
 
 
-async def generate_with_fallback(prompt: str, max_tokens: int = 500) -> Dict[str, Any]:
+# Responses the caller could use are cached on disk keyed by a hash of the
+# prompt, so identical requests skip the API across restarts and server
+# workers. Dot-prefixed, so the processed_repos cleanups leave it alone.
+LLM_CACHE_PATH = os.path.join("processed_repos", ".llm_cache.sqlite")
+
+# One connection per process, opened on first use and shared by the worker
+# threads that run cache reads and writes (guarded by _llm_cache_lock)
+_llm_cache_conn: Optional[sqlite3.Connection] = None
+_llm_cache_lock = threading.Lock()
+
+
+def _llm_cache_key(prompt: str, max_tokens: int) -> str:
+    """Cache key for a prompt and its token budget"""
+    return hashlib.sha256(f"{max_tokens}:{prompt}".encode()).hexdigest()
+
+
+def _llm_cache() -> sqlite3.Connection:
+    """The process's cache connection, opened and its table created on first use.
+    Call with _llm_cache_lock held."""
+    global _llm_cache_conn
+    if _llm_cache_conn is None:
+        os.makedirs(os.path.dirname(LLM_CACHE_PATH), exist_ok=True)
+        conn = sqlite3.connect(LLM_CACHE_PATH, timeout=5.0, check_same_thread=False)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache "
+            "(key TEXT PRIMARY KEY, provider TEXT NOT NULL, text TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        _llm_cache_conn = conn
+    return _llm_cache_conn
+
+
+def _llm_cache_reset() -> None:
+    """Drop the connection after an error so the next call reopens it.
+    Call with _llm_cache_lock held."""
+    global _llm_cache_conn
+    if _llm_cache_conn is not None:
+        _llm_cache_conn.close()
+        _llm_cache_conn = None
+
+
+def _llm_cache_get(key: str) -> Optional[Tuple[str, str]]:
+    """Return cached (provider, text) for a prompt key, if any"""
+    with _llm_cache_lock:
+        try:
+            return _llm_cache().execute("SELECT provider, text FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"[LLM] Cache read failed: {e}")
+            _llm_cache_reset()
+            return None
+
+
+def _llm_cache_put(key: str, provider: str, text: str) -> None:
+    """Store a response the caller accepted"""
+    with _llm_cache_lock:
+        try:
+            conn = _llm_cache()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?)",
+                    (key, provider, text, time.time()),
+                )
+        except sqlite3.Error as e:
+            print(f"[LLM] Cache write failed: {e}")
+            _llm_cache_reset()
+
+
+def _provider_semaphore(provider: LLMProvider) -> asyncio.Semaphore:
+    """The running loop's concurrency limit for a provider, created on first use"""
+    semaphores = _provider_semaphores.setdefault(asyncio.get_running_loop(), {})
+    semaphore = semaphores.get(provider)
+    if semaphore is None:
+        semaphore = semaphores[provider] = asyncio.Semaphore(PROVIDER_CONCURRENCY)
+    return semaphore
+
+
+async def _call_with_backoff(provider: LLMProvider, prompt: str, max_tokens: int) -> str:
+    """Call a provider under its concurrency limit, backing off and retrying on rate limits"""
+    call_fn = PROVIDER_CALLS[provider]
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        try:
+            async with _provider_semaphore(provider):
+                return await call_fn(prompt, max_tokens)
+        except LLMError as e:
+            if not e.is_rate_limit or attempt == RATE_LIMIT_RETRIES:
+                raise
+            delay = RATE_LIMIT_BACKOFF * (2 ** attempt) * random.uniform(1.0, 1.5)
+            print(f"[LLM] {provider.value} rate limited, retrying in {delay:.1f}s...")
+            await asyncio.sleep(delay)
+
+
+async def get_cached_response(prompt: str, max_tokens: int = 500) -> Optional[Dict[str, Any]]:
+    """
+    Look a prompt up in the response cache without calling any provider.
+    Returns the same dict as generate_with_fallback, or None on a miss.
+    """
+    cached = await asyncio.to_thread(_llm_cache_get, _llm_cache_key(prompt, max_tokens))
+    if not cached:
+        return None
+    print(f"[LLM] Cache hit ({cached[0]})")
+    return {"text": cached[1], "provider": cached[0], "error": None}
+
+
+async def generate_with_fallback(prompt: str, max_tokens: int = 500, use_cache: bool = True,
+                                 validate: Callable[[str], Any] = bool) -> Dict[str, Any]:
     """
     Generate text using available LLM providers with automatic fallback.
-    Returns dict with 'text' and 'provider' used.
+    Returns dict with 'text' and 'provider' used. Identical prompts are
+    answered from the response cache unless use_cache is False. A reply is
+    only cached if validate(text) is truthy - pass the caller's parser so
+    an unusable reply is never served again. By default empty text is
+    not cached.
     """
+    cache_key = _llm_cache_key(prompt, max_tokens)
+    if use_cache:
+        cached = await get_cached_response(prompt, max_tokens)
+        if cached:
+            return cached
+    
     available = get_available_providers()
     
     if not available:
@@ -195,9 +330,10 @@ async def generate_with_fallback(prompt: str, max_tokens: int = 500) -> Dict[str
     for provider in available:
         try:
             print(f"[LLM] Trying {provider.value}...")
-            call_fn = PROVIDER_CALLS[provider]
-            text = await call_fn(prompt, max_tokens)
+            text = await _call_with_backoff(provider, prompt, max_tokens)
             print(f"[LLM] Success with {provider.value}")
+            if validate(text):
+                await asyncio.to_thread(_llm_cache_put, cache_key, provider.value, text)
             return {
                 "text": text,
                 "provider": provider.value,
@@ -229,7 +365,7 @@ def parse_json_from_response(text: str) -> Optional[Dict]:
         start = text.find('{')
         end = text.rfind('}') + 1
         if start >= 0 and end > start:
-            return json.loads(text[start:end])
-    except json.JSONDecodeError:
+            return orjson.loads(text[start:end])
+    except orjson.JSONDecodeError:
         pass
     return None
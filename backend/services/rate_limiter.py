@@ -5,7 +5,7 @@ Limits function detail requests per project session
 """
 
 import time
-from typing import Dict, Tuple, Optional
+from typing import Dict, Tuple
 from collections import defaultdict
 
 
@@ -30,9 +30,6 @@ class RateLimiter:
         
         # Track summaries: {ip: [(timestamp, repo_id), ...]}
         self._summary_usage: Dict[str, list] = defaultdict(list)
-        
-        # Cache to avoid repeated AI calls for same function
-        self._function_cache: Dict[str, dict] = {}
     
     def check_function_detail_limit(self, client_ip: str, repo_id: str) -> Tuple[bool, int, int]:
         """
@@ -75,16 +72,6 @@ class RateLimiter:
         """Record a summary request"""
         self._summary_usage[client_ip].append((time.time(), repo_id))
     
-    def get_cached_function(self, repo_id: str, file_path: str, function_name: str) -> Optional[dict]:
-        """Get cached function detail if available"""
-        cache_key = f"{repo_id}:{file_path}:{function_name}"
-        return self._function_cache.get(cache_key)
-    
-    def cache_function(self, repo_id: str, file_path: str, function_name: str, data: dict):
-        """Cache function detail to avoid repeated AI calls"""
-        cache_key = f"{repo_id}:{file_path}:{function_name}"
-        self._function_cache[cache_key] = data
-    
     def reset_project_limits(self, client_ip: str, repo_id: str):
         """Reset limits for a specific project (when user uploads new project)"""
         key = (client_ip, repo_id)
@@ -96,7 +83,6 @@ class RateLimiter:
         return {
             "active_function_sessions": len(self._function_detail_usage),
             "active_summary_sessions": len(self._summary_usage),
-            "cached_functions": len(self._function_cache),
         }
 
 
@@ -0,0 +1,8 @@
+"""
+Shared pytest setup: make the backend packages (core, routes, services)
+importable when pytest is started from the repository root.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
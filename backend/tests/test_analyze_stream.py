@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test the streamed /api/analyze response in-process with FastAPI's TestClient.
+Runs without the API server: python -m pytest tests/test_analyze_stream.py
+"""
+import os
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """TestClient whose processed_repos lives in a temporary directory"""
+    # Routes resolve processed_repos relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    import main
+    return TestClient(main.app)
+
+
+def make_repo(repo_id, files):
+    """Create processed_repos/<repo_id> with the given files"""
+    repo_path = os.path.join("processed_repos", repo_id)
+    for rel_path, text in files.items():
+        path = os.path.join(repo_path, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+    return repo_path
+
+
+FILES = {
+    "app.py": "def main():\n    load_config()\n",
+    "src/config.py": "def load_config():\n    return {}\n",
+    "web/ui.js": "function render() {\n  return 1;\n}\n",
+}
+
+
+def test_streamed_body_matches_saved_map(client):
+    from core.analyzer import analyze_repo_detailed
+
+    repo_path = make_repo("repo1", FILES)
+    response = client.get("/api/analyze/repo1")
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data["status"] == "ok"
+    assert data["repo_id"] == "repo1"
+    assert data["files_analyzed"] == 3
+    assert data["functions_found"] == 3
+    assert data["cache"] == {"hits": 0, "misses": 3}
+
+    # The saved map is exactly the streamed architecture_map
+    with open(os.path.join(repo_path, "architecture_map.json"), "rb") as f:
+        saved = orjson.loads(f.read())
+    assert saved == data["architecture_map"]
+
+    expected = analyze_repo_detailed(repo_path)
+    by_path = lambda files: sorted(files, key=lambda f: f["filePath"])
+    assert by_path(saved["listOfFiles"]) == by_path(expected["listOfFiles"])
+    assert saved["edges"] == [{
+        "source": "app.py-main",
+        "target": "src/config.py-load_config",
+        "sourceFile": "app.py",
+        "targetFile": "src/config.py",
+    }]
+    assert not [name for name in os.listdir(repo_path) if name.endswith(".tmp")]
+
+    # A second run is served from the shared cache
+    assert client.get("/api/analyze/repo1").json()["cache"] == {"hits": 3, "misses": 0}
+
+
+def test_failure_mid_stream_ends_with_error_status(client, monkeypatch):
+    import routes.analysis
+
+    repo_path = make_repo("repo2", FILES)
+    assert client.get("/api/analyze/repo2").json()["status"] == "ok"
+    map_path = os.path.join(repo_path, "architecture_map.json")
+    with open(map_path, "rb") as f:
+        previous_map = f.read()
+
+    real_iter = routes.analysis.iter_analyzed_files
+
+    def failing_iter(*args, **kwargs):
+        files = real_iter(*args, **kwargs)
+        yield next(files)
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(routes.analysis, "iter_analyzed_files", failing_iter)
+    response = client.get("/api/analyze/repo2")
+
+    # Headers were already sent, so the failure is reported in a valid body
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "error"
+    assert "not saved" in data["detail"]
+    assert len(data["architecture_map"]["listOfFiles"]) == 1
+
+    with open(map_path, "rb") as f:
+        assert f.read() == previous_map
+    assert not [name for name in os.listdir(repo_path) if name.endswith(".tmp")]
+
+
+def test_missing_and_empty_repos_404(client):
+    assert client.get("/api/analyze/nope").status_code == 404
+    make_repo("empty", {"README.md": "nothing to analyze\n"})
+    assert client.get("/api/analyze/empty").status_code == 404
+
+
+def test_pretty_map_is_indented_and_matches_stream(client, monkeypatch):
+    import routes.analysis
+
+    monkeypatch.setattr(routes.analysis, "ARCH_MAP_PRETTY", True)
+    repo_path = make_repo("pretty", FILES)
+    response = client.get("/api/analyze/pretty")
+    data = response.json()
+    assert data["status"] == "ok"
+
+    with open(os.path.join(repo_path, "architecture_map.json"), "rb") as f:
+        saved = f.read()
+    assert b'\n  "filePath"' in saved
+    assert orjson.loads(saved) == data["architecture_map"]
+    # Only the saved copy is indented
+    assert b'\n  "filePath"' not in response.content
+    assert not [name for name in os.listdir(repo_path) if name.endswith(".tmp")]
+
+
+@pytest.mark.parametrize("pretty", [False, True])
+def test_map_is_only_replaced_never_rewritten_in_place(client, monkeypatch, pretty):
+    import builtins
+    import routes.analysis
+
+    monkeypatch.setattr(routes.analysis, "ARCH_MAP_PRETTY", pretty)
+    repo_path = make_repo("atomic", FILES)
+    assert client.get("/api/analyze/atomic").json()["status"] == "ok"
+
+    # Readers may hold the map open at any time, so a rerun must swap in a
+    # complete file with os.replace rather than truncate and rewrite it
+    writes = []
+    real_open = builtins.open
+
+    def recording_open(file, mode="r", *args, **kwargs):
+        if str(file).endswith("architecture_map.json") and set(mode) & set("wax+"):
+            writes.append(file)
+        return real_open(file, mode, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "open", recording_open)
+    assert client.get("/api/analyze/atomic").json()["status"] == "ok"
+    assert writes == []
+    with real_open(os.path.join(repo_path, "architecture_map.json"), "rb") as f:
+        orjson.loads(f.read())
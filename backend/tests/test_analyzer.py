@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the tree-sitter analyzer (core.analyzer).
+Runs without the API server: python -m pytest tests/test_analyzer.py
+"""
+import os
+
+import orjson
+
+from core import analyzer
+
+
+def write_files(root, files):
+    """Create files (relative path -> text) under root"""
+    for rel_path, text in files.items():
+        path = os.path.join(root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+def analyze_one(tmp_path, name, text):
+    """Detailed analysis of a single file, keyed by function name"""
+    write_files(tmp_path, {name: text})
+    result = analyzer.analyze_file_detailed(str(tmp_path / name), str(tmp_path))
+    return {func["name"]: func for func in result["listOfFunctions"]}
+
+
+def test_method_calls_use_attribute_name(tmp_path):
+    py = analyze_one(tmp_path, "a.py", "def run(client):\n    client.fetch_rows()\n    self.save()\n")
+    assert py["run"]["calls"] == ["fetch_rows", "save"]
+
+    js = analyze_one(tmp_path, "a.js", "function run() {\n  this.render();\n  api.client.load();\n}\n")
+    assert js["run"]["calls"] == ["load", "render"]
+
+
+def test_nested_function_calls_belong_to_nested_function(tmp_path):
+    funcs = analyze_one(tmp_path, "a.py", (
+        "def outer():\n"
+        "    def inner():\n"
+        "        helper()\n"
+        "    return inner()\n"
+    ))
+    assert funcs["outer"]["calls"] == ["inner"]
+    assert funcs["inner"]["calls"] == ["helper"]
+
+
+def test_calls_are_sorted_and_deduplicated(tmp_path):
+    funcs = analyze_one(tmp_path, "a.py", "def f():\n    zeta()\n    alpha()\n    mid()\n    alpha()\n    f()\n")
+    # Recursion and builtins are left out
+    assert funcs["f"]["calls"] == ["alpha", "mid", "zeta"]
+
+
+def test_return_type_fields(tmp_path):
+    assert analyze_one(tmp_path, "a.py", "def f(x: int, y=2) -> List[int]:\n    return [x]\n")["f"]["returnType"] == "List[int]"
+    assert analyze_one(tmp_path, "a.rs", "fn f() -> u32 { 1 }\n")["f"]["returnType"] == "u32"
+    assert analyze_one(tmp_path, "A.java", "class A { String f() { return \"\"; } }\n")["f"]["returnType"] == "String"
+    assert analyze_one(tmp_path, "a.cpp", "int f(int x) { return x; }\n")["f"]["returnType"] == "int"
+    assert analyze_one(tmp_path, "a.js", "function f() { return 1; }\n")["f"]["returnType"] == "unknown"
+
+    py = analyze_one(tmp_path, "b.py", "def g(x: int, y=2):\n    pass\n")["g"]
+    assert py["parameters"] == ["x: int", "y=..."]
+    assert py["returnType"] == "unknown"
+
+
+def test_non_ascii_source_uses_byte_offsets(tmp_path):
+    text = (
+        "# Grüße, 日本語 — ünïcödé before the functions\n"
+        "GREETING = \"héllo wörld ✓\"\n"
+        "\n"
+        "def héllo(naïve: str) -> str:\n"
+        "    return wörld(naïve)\n"
+        "\n"
+        "def wörld(s):\n"
+        "    return s + \"✓\"\n"
+    )
+    funcs = analyze_one(tmp_path, "u.py", text)
+
+    assert funcs["héllo"]["code"] == "def héllo(naïve: str) -> str:\n    return wörld(naïve)"
+    assert funcs["héllo"]["parameters"] == ["naïve: str"]
+    assert funcs["héllo"]["calls"] == ["wörld"]
+    assert funcs["héllo"]["startLine"] == 4
+    assert funcs["wörld"]["code"] == "def wörld(s):\n    return s + \"✓\""
+    assert analyzer.get_function_code(str(tmp_path / "u.py"), "wörld") == funcs["wörld"]["code"]
+
+
+def test_minified_files_are_skipped_by_both_apis(tmp_path):
+    write_files(tmp_path, {
+        "ok.js": "function ok() { return 1; }\n",
+        "vendor.min.js": "function a() { return 1; }\n",
+        "bundle.js": "function b(){return 1}" + ";var x=1" * 600 + "\n",
+    })
+
+    detailed = analyzer.analyze_repo_detailed(str(tmp_path))
+    assert [f["filePath"] for f in detailed["listOfFiles"]] == ["ok.js"]
+
+    legacy = analyzer.analyze_repo(str(tmp_path))
+    assert [os.path.basename(f) for f in legacy["metadata"]] == ["ok.js"]
+
+
+def test_disk_cache_hits_and_misses(tmp_path):
+    repo = tmp_path / "repo"
+    cache_dir = str(tmp_path / "cache")
+    write_files(repo, {"a.py": "def a():\n    b()\n", "pkg/b.py": "def b():\n    pass\n"})
+
+    stats = {}
+    cold = list(analyzer.iter_analyzed_files(str(repo), cache_dir, stats))
+    assert stats == {"misses": 2}
+
+    stats = {}
+    warm = list(analyzer.iter_analyzed_files(str(repo), cache_dir, stats))
+    assert stats == {"hits": 2}
+    assert sorted(warm, key=lambda f: f["filePath"]) == sorted(cold, key=lambda f: f["filePath"])
+
+    # Only the changed file is re-analyzed
+    write_files(repo, {"a.py": "def a():\n    c()\n"})
+    stats = {}
+    list(analyzer.iter_analyzed_files(str(repo), cache_dir, stats))
+    assert stats == {"hits": 1, "misses": 1}
+
+    # Entries are plain JSON, and nothing is written into the analyzed tree
+    for name in os.listdir(cache_dir):
+        with open(os.path.join(cache_dir, name), "rb") as f:
+            orjson.loads(f.read())
+    assert sorted(os.listdir(repo)) == ["a.py", "pkg"]
+
+
+def test_no_cache_without_cache_dir(tmp_path):
+    write_files(tmp_path, {"a.py": "def a():\n    pass\n"})
+    stats = {}
+    list(analyzer.iter_analyzed_files(str(tmp_path), stats=stats))
+    list(analyzer.iter_analyzed_files(str(tmp_path), stats=stats))
+    assert stats == {"misses": 2}
+    assert os.listdir(tmp_path) == ["a.py"]
+
+
+def test_prune_cache_evicts_least_recently_used(tmp_path):
+    for i in range(5):
+        path = tmp_path / f"entry{i}"
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (i, 1000 + i))
+    (tmp_path / "writing.tmp").write_bytes(b"x" * 1000)
+
+    assert analyzer.prune_cache(str(tmp_path), 250) == 3
+    assert sorted(os.listdir(tmp_path)) == ["entry3", "entry4", "writing.tmp"]
+
+
+def test_call_edges_link_files(tmp_path):
+    write_files(tmp_path, {"a.py": "def a():\n    b()\n", "b.py": "def b():\n    pass\n"})
+    result = analyzer.analyze_repo_detailed(str(tmp_path))
+    assert result["edges"] == [{"source": "a.py-a", "target": "b.py-b", "sourceFile": "a.py", "targetFile": "b.py"}]
+    assert result["totalFiles"] == 2
+    assert result["totalFunctions"] == 2
+
+
+def test_process_pool_matches_inline_analysis(tmp_path, monkeypatch):
+    write_files(tmp_path, {f"pkg{i % 3}/m{i}.py": f"def f{i}():\n    f{i + 1}()\n" for i in range(20)})
+    inline = analyzer.analyze_repo_detailed(str(tmp_path))
+
+    # Force a two-worker pool even on a single-core machine
+    monkeypatch.setattr(analyzer, "_analysis_workers", lambda: 2)
+    monkeypatch.setattr(analyzer, "_ANALYSIS_POOL", None)
+    try:
+        pooled = analyzer.analyze_repo_detailed(str(tmp_path))
+        legacy = analyzer.analyze_repo(str(tmp_path))
+        assert analyzer._ANALYSIS_POOL._mp_context.get_start_method() in ("forkserver", "spawn")
+    finally:
+        if analyzer._ANALYSIS_POOL is not None:
+            analyzer._ANALYSIS_POOL.shutdown()
+
+    assert pooled == inline
+    assert len(legacy["nodes"]) == 20
+
+
+def test_discovery_matches_extensions_case_insensitively(tmp_path):
+    write_files(tmp_path, {
+        "Foo.Py": "def foo():\n    pass\n",
+        "main.Rs": "fn main() {}\n",
+        "APP.JS": "function app() {}\n",
+        "Vendor.MIN.js": "function v() {}\n",
+        "notes.txt": "def not_code():\n",
+    })
+    found = sorted(os.path.basename(p) for p in analyzer.find_source_files(str(tmp_path)))
+    assert found == ["APP.JS", "Foo.Py", "main.Rs"]
+
+    languages = {f["filePath"]: f["language"] for f in analyzer.analyze_repo_detailed(str(tmp_path))["listOfFiles"]}
+    assert languages == {"APP.JS": "javascript", "Foo.Py": "python", "main.Rs": "rust"}
+
+
+def test_cache_key_includes_minified_threshold(tmp_path, monkeypatch):
+    repo = tmp_path / "repo"
+    cache_dir = str(tmp_path / "cache")
+    write_files(repo, {"wide.js": "function wide() { return 1; }" + " " * 3000 + "\n"})
+
+    stats = {}
+    assert list(analyzer.iter_analyzed_files(str(repo), cache_dir, stats)) == []
+    assert stats == {"misses": 1}
+
+    # Raising the threshold must not serve the cached "skipped" decision
+    monkeypatch.setattr(analyzer, "MINIFIED_LINE_LENGTH", 5000)
+    stats = {}
+    files = list(analyzer.iter_analyzed_files(str(repo), cache_dir, stats))
+    assert stats == {"misses": 1}
+    assert [f["filePath"] for f in files] == ["wide.js"]
+
+
+def test_pool_results_stream_before_discovery_finishes(tmp_path, monkeypatch):
+    write_files(tmp_path, {f"m{i:03}.py": f"def f{i}():\n    pass\n" for i in range(200)})
+    paths = sorted(analyzer.find_source_files(str(tmp_path)))
+    discovered = []
+
+    def discovery():
+        for path in paths:
+            discovered.append(path)
+            yield path
+
+    # Force a two-worker pool even on a single-core machine
+    monkeypatch.setattr(analyzer, "_analysis_workers", lambda: 2)
+    monkeypatch.setattr(analyzer, "_ANALYSIS_POOL", None)
+    try:
+        results = analyzer._submit_in_order(analyzer._get_analysis_pool(), discovery(), str(tmp_path), None)
+        first, _ = next(results)
+        # At most one full window of batches was discovered ahead of the first result
+        assert len(discovered) <= 2 * analyzer.ANALYSIS_BATCHES_PER_WORKER * analyzer.ANALYSIS_BATCH_SIZE
+        rest = [result for result, _ in results]
+    finally:
+        analyzer._ANALYSIS_POOL.shutdown()
+
+    assert [f["filePath"] for f in [first] + rest] == [os.path.basename(p) for p in paths]
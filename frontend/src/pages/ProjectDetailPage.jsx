@@ -52,6 +52,8 @@ export default function ProjectDetailPage() {
       const analyzeRes = await fetch(`${apiBase}/api/analyze/${repoId}`);
       if (!analyzeRes.ok) throw new Error(`Analysis failed: ${analyzeRes.status}`);
       const analysisResult = await analyzeRes.json();
+      // The body is streamed, so a failure mid-analysis arrives as status "error" under a 200
+      if (analysisResult.status !== "ok") throw new Error(analysisResult.detail || "Analysis failed");
       setAnalysisData(analysisResult);
 
       const summaryRes = await fetch(`${apiBase}/api/project-summary/${repoId}`);